@@ -0,0 +1,112 @@
+"""
+Admission control for LLM calls.
+
+Caps concurrent upstream calls, lets a bounded number of requests wait for a
+slot up to a deadline, and allows one in-flight turn per chat session. Anything
+beyond that is rejected immediately with `AdmissionRejected` so a spike turns
+into fast 429/503 responses instead of a pile of requests timing out upstream.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Optional, Set
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, status_code: int, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Global concurrency limit + bounded wait queue + per-session serialization"""
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 64, queue_timeout: float = 2.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._sessions: Set[str] = set()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _claim_session(self, session_id: Optional[str]):
+        if session_id is None:
+            return
+        if session_id in self._sessions:
+            self.rejected += 1
+            raise AdmissionRejected("A reply for this session is already in progress", 429)
+        self._sessions.add(session_id)
+
+    @contextmanager
+    def session_turn(self, session_id: str):
+        """Per-session serialization alone, for turns whose LLM slot is acquired by a shared call"""
+        self._claim_session(session_id)
+        try:
+            yield
+        finally:
+            self._sessions.discard(session_id)
+
+    async def acquire(self, session_id: Optional[str]) -> Callable[[], None]:
+        """Wait for a slot (and claim the session unless None); returns an idempotent release callback"""
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected("Assistant is at capacity, please retry shortly", 503)
+
+        self._claim_session(session_id)
+        self.waiting += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._sessions.discard(session_id)
+            self.rejected += 1
+            raise AdmissionRejected("Assistant is at capacity, please retry shortly", 503)
+        except BaseException:
+            self._sessions.discard(session_id)
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.admitted += 1
+        self.active += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            self.active -= 1
+            self._sessions.discard(session_id)
+            self._slots.release()
+
+        return release
+
+    @asynccontextmanager
+    async def admit(self, session_id: Optional[str]):
+        release = await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.wait_total / self.admitted if self.admitted else 0.0,
+            "max_wait_seconds": self.wait_max,
+        }
@@ -0,0 +1,230 @@
+"""
+Offline load test and benchmark for the AetherX API.
+
+Runs the FastAPI `app` in-process against the in-memory Mongo stand-in and the
+fake LLM provider, drives the hot endpoints with an asyncio load generator and
+reports throughput and p50/p95/p99 latency per scenario. Results can be saved
+as a baseline JSON and later runs compared against it.
+
+    python bench.py --requests 2000 --concurrency 50
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json   # exits 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+QUESTIONS = [
+    "Hello, what is AetherX?",
+    "What is the pricing?",
+    "When is the launch date?",
+    "What features does AetherX offer?",
+    "How do I join the waitlist?",
+    "Does it support other languages?",
+]
+
+TURNS_PER_SESSION = 4
+
+
+class ASGIDriver:
+    """Calls an ASGI app directly, without sockets or an HTTP client"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, body: Optional[dict] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        path, _, query = path.partition("?")
+        payload = json.dumps(body).encode() if body is not None else b""
+        raw_headers = [(b"host", b"bench"), (b"content-length", str(len(payload)).encode())]
+        if body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+        for k, v in (headers or {}).items():
+            raw_headers.append((k.lower().encode(), v.encode()))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": query.encode(), "root_path": "", "headers": raw_headers,
+            "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+        }
+        done = asyncio.Event()
+        sent_body = False
+        status = 0
+        chunks = []
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status, b"".join(chunks)
+
+
+def scenario_requests(name: str, worker: int, i: int, run_id: str):
+    if name == "chat":
+        session = f"bench-{run_id}-{worker}-{i // TURNS_PER_SESSION}"
+        message = QUESTIONS[(worker + i) % len(QUESTIONS)]
+        return "POST", "/api/chat", {"session_id": session, "message": message}
+    if name == "subscribe":
+        # Every tenth signup repeats an earlier email to exercise the duplicate path
+        n = i - 1 if i % 10 == 9 else i
+        return "POST", "/api/newsletter/subscribe", {"email": f"bench-{run_id}-{worker}-{n}@example.com"}
+    if name == "count":
+        return "GET", "/api/newsletter/count", None
+    if name == "launch_config":
+        return "GET", "/api/launch/config", None
+    raise ValueError(f"Unknown scenario {name}")
+
+
+SCENARIOS = ["chat", "subscribe", "count", "launch_config"]
+
+
+async def run_scenario(driver: ASGIDriver, name: str, total: int, concurrency: int, warmup: int = 0) -> dict:
+    # Unmeasured warm-up round so caches and lazy state do not land in the percentiles
+    if warmup:
+        await run_scenario(driver, name, warmup, min(concurrency, warmup))
+    run_id = uuid.uuid4().hex[:6]
+    latencies: List[float] = []
+    errors = 0
+    per_worker = [total // concurrency + (1 if w < total % concurrency else 0) for w in range(concurrency)]
+
+    async def worker(w: int):
+        nonlocal errors
+        for i in range(per_worker[w]):
+            method, path, body = scenario_requests(name, w, i, run_id)
+            start = time.perf_counter()
+            status, _ = await driver.request(method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` in p95 latency or throughput"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("results", baseline).get(name)
+        if not base:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']} rps vs baseline {base['throughput_rps']} rps"
+            )
+    return regressions
+
+
+def load_app(llm_latency: float, llm_tokens_per_second: float, mongo_latency: float):
+    """Import the app wired to the fake LLM and the in-memory Mongo"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "bench")
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["SCHEMA_BOOTSTRAP"] = "0"
+    import server
+    from llm_provider import FakeLLMProvider
+    from memory_mongo import MemoryDatabase
+    from rate_limit import RateLimiter
+
+    server.db = MemoryDatabase(latency=mongo_latency)
+    server.llm = FakeLLMProvider(latency=llm_latency, tokens_per_second=llm_tokens_per_second)
+    # Every simulated client shares one address; measure the handlers, not the limiter
+    server.rate_limits = RateLimiter({})
+    return server
+
+
+async def run_benchmark(scenarios: List[str], total: int, concurrency: int, llm_latency: float = 0.2,
+                        llm_tokens_per_second: float = 200.0, mongo_latency: float = 0.001,
+                        progress: Callable[[str], None] = lambda _: None) -> dict:
+    server = load_app(llm_latency, llm_tokens_per_second, mongo_latency)
+    await server.db.newsletter_subscriptions.create_index("email", unique=True)
+    driver = ASGIDriver(server.app)
+    results = {}
+    async with server.app.router.lifespan_context(server.app):
+        for name in scenarios:
+            results[name] = await run_scenario(driver, name, total, concurrency, warmup=concurrency)
+            progress(name)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--mongo-latency", type=float, default=0.001, help="simulated Mongo round trip (s)")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="write results to this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.disable(logging.INFO)
+
+    settings = {
+        "requests": args.requests, "concurrency": args.concurrency,
+        "llm_latency": args.llm_latency, "llm_tokens_per_second": args.llm_tokens_per_second,
+        "mongo_latency": args.mongo_latency,
+    }
+    results = asyncio.run(run_benchmark(
+        args.scenarios.split(","), args.requests, args.concurrency,
+        args.llm_latency, args.llm_tokens_per_second, args.mongo_latency,
+    ))
+
+    print(f"{'scenario':<15}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in results.items():
+        print(f"{name:<15}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Session context layer for the chatbot.
+
+Rebuilds a conversation from `chat_history` (user and assistant turns) into a
+single prompt so every chat turn costs exactly one LLM call, and keeps hot
+sessions in a bounded in-process LRU so most turns skip the Mongo read. With a
+shared `StateBackend` every change to a session bumps its version there, and
+other workers drop their cached copy when they see a newer version.
+
+Prompts are kept under a token budget: the newest turns that fit are sent
+verbatim and everything older is represented by a rolling per-session summary
+in `chat_summaries`, which `ContextCompactor` extends incrementally in the
+background so prompt size stays flat however long a session runs.
+"""
+import asyncio
+import logging
+import struct
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from state_backend import StateBackend
+
+logger = logging.getLogger(__name__)
+
+# Number of stored turns replayed into the prompt
+CONTEXT_TURNS = 10
+
+_VERSION = struct.Struct("<q")
+
+# Per-turn framing overhead ("User: " etc.) in estimated tokens
+TURN_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate (~4 characters per token for English BPE)"""
+    return (len(text) + 3) // 4
+
+
+class SessionContext:
+    """Recent turns of a session plus the summary of everything before them"""
+
+    __slots__ = ("turns", "summary", "summary_through")
+
+    def __init__(self, turns: List[dict], summary: str = "", summary_through: Optional[datetime] = None):
+        self.turns = turns
+        self.summary = summary
+        self.summary_through = summary_through
+
+    @property
+    def empty(self) -> bool:
+        return not self.turns and not self.summary
+
+    def unsummarized(self) -> List[dict]:
+        if self.summary_through is None:
+            return self.turns
+        return [t for t in self.turns if t["timestamp"] > self.summary_through]
+
+
+class SessionContextCache:
+    """Bounded LRU of recent turns per session with idle eviction"""
+
+    def __init__(self, max_sessions: int = 1024, idle_ttl: float = 900.0, max_turns: int = CONTEXT_TURNS,
+                 state: Optional[StateBackend] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        # Shared session versions; None when this process is the only one serving sessions
+        self.state = state
+        # session_id -> (context, last used, version)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _version(self, session_id: str) -> int:
+        if self.state is None:
+            return 0
+        raw = self.state.get(f"ctx:{session_id}")
+        return _VERSION.unpack(raw)[0] if raw else 0
+
+    def _bump(self, session_id: str) -> int:
+        if self.state is None:
+            return 0
+        raw = self.state.update(
+            f"ctx:{session_id}",
+            lambda raw: _VERSION.pack((_VERSION.unpack(raw)[0] if raw else 0) + 1),
+            ttl=self.idle_ttl
+        )
+        return _VERSION.unpack(raw)[0]
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[SessionContext]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        context, last_used, version = entry
+        now = time.monotonic()
+        # Another worker changed the session since this copy was cached
+        if now - last_used > self.idle_ttl or version != self._version(session_id):
+            del self._sessions[session_id]
+            return None
+        self._sessions[session_id] = (context, now, version)
+        self._sessions.move_to_end(session_id)
+        return context
+
+    def put(self, session_id: str, context: SessionContext):
+        del context.turns[:-self.max_turns]
+        self._sessions[session_id] = (context, time.monotonic(), self._version(session_id))
+        self._sessions.move_to_end(session_id)
+        self._evict()
+
+    def _changed(self, session_id: str, context: Optional[SessionContext]):
+        # Bump the shared version; our copy already has the change and keeps the new version,
+        # unless another worker bumped it in between, in which case our copy is stale
+        entry = self._sessions.get(session_id)
+        version = self._bump(session_id)
+        if context is not None and entry is not None:
+            if version == entry[2] + 1 or self.state is None:
+                self._sessions[session_id] = (context, time.monotonic(), version)
+            else:
+                del self._sessions[session_id]
+
+    def append(self, session_id: str, role: str, content: str, timestamp: datetime):
+        """Append a turn to a cached session; uncached sessions are left to load from Mongo"""
+        context = self.get(session_id)
+        if context is not None:
+            context.turns.append({"role": role, "content": content, "timestamp": timestamp})
+            del context.turns[:-self.max_turns]
+        self._changed(session_id, context)
+
+    def set_summary(self, session_id: str, summary: str, through: datetime):
+        context = self.get(session_id)
+        if context is not None:
+            context.summary = summary
+            context.summary_through = through
+        self._changed(session_id, context)
+
+    def invalidate(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._bump(session_id)
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = [sid for sid, (_, last_used, _) in self._sessions.items() if last_used < cutoff]
+        for sid in stale:
+            del self._sessions[sid]
+        return len(stale)
+
+    def _evict(self):
+        # Entries are kept in recency order, so idle ones sit at the front
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            sid, (_, last_used, _) = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or last_used < cutoff:
+                self._sessions.popitem(last=False)
+            else:
+                break
+
+
+async def load_context(db, cache: SessionContextCache, session_id: str) -> SessionContext:
+    """Return the session context, reading Mongo only on a cache miss"""
+    context = cache.get(session_id)
+    if context is not None:
+        return context
+
+    docs, summary = await asyncio.gather(
+        db.chat_history.find(
+            {"session_id": session_id},
+            {"_id": 0, "role": 1, "content": 1, "timestamp": 1}
+        ).sort("timestamp", -1).to_list(cache.max_turns),
+        db.chat_summaries.find_one({"session_id": session_id}, {"_id": 0}),
+    )
+    context = SessionContext(list(reversed(docs)))
+    if summary:
+        context.summary = summary["summary"]
+        context.summary_through = summary["through"]
+    cache.put(session_id, context)
+    return context
+
+
+def fit_turns(context: SessionContext, message: str, budget: int) -> List[dict]:
+    """Newest unsummarized turns that fit in the budget left after the summary and message"""
+    remaining = budget - estimate_tokens(message) - estimate_tokens(context.summary)
+    kept = []
+    for turn in reversed(context.unsummarized()):
+        cost = estimate_tokens(turn["content"]) + TURN_OVERHEAD
+        if cost > remaining:
+            break
+        kept.append(turn)
+        remaining -= cost
+    kept.reverse()
+    return kept
+
+
+def build_prompt(context: SessionContext, message: str, budget: int = 1500) -> str:
+    """Render the summary, recent turns and the new message as a single user prompt"""
+    turns = fit_turns(context, message, budget)
+    if not turns and not context.summary:
+        return message
+
+    lines = []
+    if context.summary:
+        lines.append("Summary of the earlier conversation:")
+        lines.append(context.summary)
+        lines.append("")
+    if turns:
+        lines.append("Conversation so far:")
+        for turn in turns:
+            speaker = "User" if turn["role"] == "user" else "Assistant"
+            lines.append(f"{speaker}: {turn['content']}")
+        lines.append("")
+    lines.append(f"Reply to the user's latest message: {message}")
+    return "\n".join(lines)
+
+
+class ContextCompactor:
+    """Folds older turns into the session's rolling summary off the request path"""
+
+    def __init__(self, summarize: Callable[[str, List[dict]], Awaitable[str]], keep_turns: int = 6,
+                 fold_batch: int = 4, max_fold: int = 200, concurrency: int = 2,
+                 pending: Optional[Callable[[str], List[dict]]] = None):
+        self.summarize = summarize
+        # Turns of a session not yet written to `chat_history` (the write-behind queue)
+        self.pending = pending
+        self.keep_turns = keep_turns
+        self.fold_batch = fold_batch
+        self.max_fold = max_fold
+        self._slots = asyncio.Semaphore(concurrency)
+        self._scheduled = set()
+        self.compactions = 0
+
+    def needs_compaction(self, context: SessionContext, message: str, budget: int) -> bool:
+        unsummarized = context.unsummarized()
+        if len(unsummarized) >= self.keep_turns + self.fold_batch:
+            return True
+        return len(fit_turns(context, message, budget)) < len(unsummarized)
+
+    def schedule(self, db, cache: SessionContextCache, session_id: str):
+        if session_id in self._scheduled:
+            return
+        self._scheduled.add(session_id)
+        asyncio.ensure_future(self._run(db, cache, session_id))
+
+    async def _run(self, db, cache: SessionContextCache, session_id: str):
+        try:
+            async with self._slots:
+                await self.compact(db, cache, session_id)
+        except Exception as e:
+            logger.error(f"Context compaction failed for {session_id}: {str(e)}")
+        finally:
+            self._scheduled.discard(session_id)
+
+    async def compact(self, db, cache: SessionContextCache, session_id: str) -> bool:
+        """Fold every stored turn except the newest `keep_turns` into the summary"""
+        existing = await db.chat_summaries.find_one({"session_id": session_id}, {"_id": 0})
+        through = existing["through"] if existing else None
+        query = {"session_id": session_id}
+        if through is not None:
+            query["timestamp"] = {"$gt": through}
+        limit = self.max_fold + self.keep_turns
+        docs = await db.chat_history.find(
+            query,
+            {"_id": 0, "id": 1, "role": 1, "content": 1, "timestamp": 1}
+        ).sort("timestamp", 1).to_list(limit)
+        if self.pending and len(docs) < limit:
+            # The newest turns may still be queued; without them they would be folded too.
+            # (A truncated read is left alone: the queued turns are not next to it.)
+            seen = {d.get("id") for d in docs}
+            docs += [
+                d for d in self.pending(session_id)
+                if d.get("id") not in seen and (through is None or d["timestamp"] > through)
+            ]
+
+        fold = docs[:-self.keep_turns] if self.keep_turns else docs
+        if not fold:
+            return False
+
+        summary = await self.summarize(existing["summary"] if existing else "", fold)
+        new_through = fold[-1]["timestamp"]
+        try:
+            # Conditional on the previous watermark so concurrent compactions cannot regress it
+            await db.chat_summaries.update_one(
+                {"session_id": session_id, "through": through},
+                {"$set": {
+                    "summary": summary,
+                    "through": new_through,
+                    "updated_at": datetime.now(timezone.utc),
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        cache.set_summary(session_id, summary, new_through)
+        self.compactions += 1
+        return True
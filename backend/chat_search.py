@@ -0,0 +1,137 @@
+"""
+Full-text search over hot chat history.
+
+Queries use the `content_text` text index on `chat_history` (Mongo's stemming
+and stop words, so "pricing" also finds "price"), narrowed by role and time
+range. A page takes two queries: an aggregation groups the matches by session
+into `(last_match, matches)` only, newest first from an opaque
+`(last_match, session_id)` cursor, and keeps `limit` sessions; then the
+`per_session` newest matching messages are fetched for just those sessions.
+Message bodies are therefore only read for the page, never for every match.
+Archived sessions are compressed in `chat_archive` and are not searched.
+
+Snippets are cut around the first hit in each message, and the ranges of
+every hit in the snippet are returned with it, so clients can highlight them
+without trusting markup inside chat content.
+"""
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pagination import decode_cursor, encode_cursor
+
+SNIPPET_CHARS = 160
+
+
+def search_terms(query: str) -> List[str]:
+    """Quoted phrases and bare words of a $text query, without negated terms"""
+    phrases = re.findall(r'"([^"]+)"', query)
+    rest = re.sub(r'"[^"]*"', " ", query)
+    words = [w for w in rest.split() if not w.startswith("-")]
+    return [t.strip().lower() for t in phrases + words if t.strip()]
+
+
+def _term_pattern(terms: List[str]) -> Optional[re.Pattern]:
+    parts = []
+    for term in sorted(terms, key=len, reverse=True):
+        if " " in term:
+            parts.append(re.escape(term))
+        else:
+            # Approximates the stemmer: "pricing" -> "pric\w*" also marks "price" and "prices"
+            parts.append(re.escape(term[:max(4, len(term) - 3)]) + r"\w*")
+    return re.compile(r"\b(?:" + "|".join(parts) + r")", re.IGNORECASE) if parts else None
+
+
+def highlight(content: str, terms: List[str], width: int = SNIPPET_CHARS) -> dict:
+    """Snippet of `content` around its first hit and the [start, end) of each hit in it"""
+    pattern = _term_pattern(terms)
+    first = pattern.search(content) if pattern else None
+    start = 0
+    if first and len(content) > width:
+        start = max(0, min(first.start() - width // 3, len(content) - width))
+    end = min(len(content), start + width)
+    snippet = content[start:end]
+    hits = [[m.start(), m.end()] for m in pattern.finditer(snippet)] if pattern else []
+    if start > 0:
+        snippet = "…" + snippet
+        hits = [[s + 1, e + 1] for s, e in hits]
+    if end < len(content):
+        snippet += "…"
+    return {"snippet": snippet, "highlights": hits}
+
+
+def search_filter(query: str, role: Optional[str], start: Optional[datetime],
+                  end: Optional[datetime]) -> dict:
+    match: dict = {"$text": {"$search": query}}
+    if role:
+        match["role"] = role
+    if start or end:
+        match["timestamp"] = {**({"$gte": start} if start else {}), **({"$lt": end} if end else {})}
+    return match
+
+
+def search_pipeline(match: dict, after: Optional[Tuple[datetime, str]], limit: int) -> List[dict]:
+    """Sessions with matches, newest match first: ids and counts only, no message bodies"""
+    pipeline: List[dict] = [
+        {"$match": match},
+        {"$group": {"_id": "$session_id", "last_match": {"$max": "$timestamp"}, "matches": {"$sum": 1}}},
+    ]
+    if after:
+        last_match, session_id = after
+        pipeline.append({"$match": {"$or": [
+            {"last_match": {"$lt": last_match}},
+            {"last_match": last_match, "_id": {"$lt": session_id}},
+        ]}})
+    pipeline += [
+        {"$sort": {"last_match": -1, "_id": -1}},
+        {"$limit": limit + 1},
+    ]
+    return pipeline
+
+
+async def _page_messages(collection, match: dict, session_ids: List[str], per_session: int) -> Dict[str, list]:
+    """The `per_session` newest matching messages of each session on the page"""
+    messages: Dict[str, list] = {sid: [] for sid in session_ids}
+    wanted = len(session_ids)
+    cursor = collection.find(
+        {**match, "session_id": {"$in": session_ids}},
+        {"_id": 0, "id": 1, "session_id": 1, "role": 1, "content": 1, "timestamp": 1},
+    ).sort("timestamp", -1)
+    async for doc in cursor:
+        found = messages[doc["session_id"]]
+        if len(found) < per_session:
+            found.append(doc)
+            if len(found) == per_session:
+                wanted -= 1
+                if not wanted:
+                    break
+    return messages
+
+
+async def search_chats(collection, query: str, role: Optional[str] = None, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None, limit: int = 20, cursor: Optional[str] = None,
+                       per_session: int = 3) -> dict:
+    """One page of sessions with messages matching `query`, and the cursor for the next page"""
+    after = decode_cursor(cursor) if cursor else None
+    match = search_filter(query, role, start, end)
+    groups = [g async for g in collection.aggregate(search_pipeline(match, after, limit), allowDiskUse=True)]
+    next_cursor = None
+    if len(groups) > limit:
+        groups = groups[:limit]
+        next_cursor = encode_cursor({"last_match": groups[-1]["last_match"], "id": groups[-1]["_id"]}, "last_match")
+
+    messages = await _page_messages(collection, match, [g["_id"] for g in groups], per_session) if groups else {}
+    terms = search_terms(query)
+    results = [
+        {
+            "session_id": group["_id"],
+            "last_match": group["last_match"],
+            "matches": group["matches"],
+            "messages": [
+                {"id": m["id"], "role": m["role"], "timestamp": m["timestamp"], **highlight(m["content"], terms)}
+                for m in messages[group["_id"]]
+            ],
+        }
+        for group in groups
+    ]
+    return {"results": results, "next_cursor": next_cursor}
@@ -0,0 +1,116 @@
+"""
+Circuit breaker for upstream LLM calls.
+
+Outcomes of the last `window` calls are kept in a ring; a call fails if it
+raises, misses its deadline or takes longer than `slow_call`. Once at least
+`min_calls` are recorded and the failure ratio reaches `failure_ratio` the
+circuit opens: calls are refused with `CircuitOpen` without contacting the
+provider, so chat can answer from the FAQ cache or a canned reply at once.
+After `open_for` seconds the circuit goes half-open and lets `probes` calls
+through; a successful probe closes it, a failed one opens it again.
+"""
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("LLM circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Rolling-window error/latency breaker with half-open probes"""
+
+    def __init__(self, window: int = 20, min_calls: int = 10, failure_ratio: float = 0.5,
+                 slow_call: float = 5.0, open_for: float = 30.0, probes: int = 1, clock=time.monotonic):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call = slow_call
+        self.open_for = open_for
+        self.probes = probes
+        self.clock = clock
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def _reopen_due(self) -> bool:
+        return self.clock() - self._opened_at >= self.open_for
+
+    def check(self):
+        """Raise `CircuitOpen` if a call now would be refused; claims nothing"""
+        if self.state == OPEN and not self._reopen_due():
+            self.rejected += 1
+            raise CircuitOpen(self.open_for - (self.clock() - self._opened_at))
+        if self.state == HALF_OPEN and self._probing >= self.probes:
+            self.rejected += 1
+            raise CircuitOpen(1.0)
+
+    def begin(self) -> bool:
+        """Admit one call (or raise `CircuitOpen`); True when it is a half-open probe"""
+        self.check()
+        if self.state == CLOSED:
+            return False
+        self.state = HALF_OPEN
+        self._probing += 1
+        return True
+
+    def end(self, probe: bool, ok: bool, elapsed: float):
+        """Record the outcome of a call admitted by `begin`"""
+        ok = ok and elapsed <= self.slow_call
+        if probe:
+            self._probing -= 1
+            if ok:
+                self._close()
+            else:
+                self._open()
+            return
+        if len(self._outcomes) == self._outcomes.maxlen and not self._outcomes[0]:
+            self._failures -= 1
+        self._outcomes.append(ok)
+        if not ok:
+            self._failures += 1
+        if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                and self._failures / len(self._outcomes) >= self.failure_ratio):
+            self._open()
+
+    @asynccontextmanager
+    async def guard(self):
+        """`begin` and `end` around the body; an exception counts as a failure"""
+        probe = self.begin()
+        start = self.clock()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.end(probe, ok, self.clock() - start)
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self.clock()
+        self.opened += 1
+
+    def _close(self):
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+
+    def stats(self) -> dict:
+        return {
+            "state": OPEN if self.state == OPEN and not self._reopen_due() else self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._failures,
+            "failure_ratio": self._failures / len(self._outcomes) if self._outcomes else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,88 @@
+"""
+Maintained document counters.
+
+A counter lives in the `counters` collection as `{_id: name, value: n}` and is
+bumped with `$inc` wherever the counted collection is inserted into, so reads
+are a single `_id` lookup instead of a `count_documents` scan. Reads go through
+a short-TTL cache in a `StateBackend` (shared by all workers with `MmapState`)
+with request coalescing: while a refresh is in flight every caller awaits the
+same read. A periodic reconciliation recounts
+the source collection and corrects any drift.
+"""
+import asyncio
+import logging
+import struct
+from typing import Optional
+
+from state_backend import LocalState, StateBackend
+
+logger = logging.getLogger(__name__)
+
+_VALUE = struct.Struct("<q")
+
+
+class CachedCounter:
+    """Counter document for `collection`, cached for `ttl` seconds"""
+
+    def __init__(self, collection: str, ttl: float = 2.0, state: Optional[StateBackend] = None):
+        self.collection = collection
+        self.ttl = ttl
+        self.state = state if state is not None else LocalState()
+        self._key = f"count:{collection}"
+        self._inflight: Optional[asyncio.Future] = None
+        self.reads = 0
+
+    def cached(self) -> Optional[int]:
+        raw = self.state.get(self._key)
+        # An empty value marks an increment that found nothing cached
+        return _VALUE.unpack(raw)[0] if raw else None
+
+    async def get(self, db) -> int:
+        value = self.cached()
+        if value is not None:
+            return value
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._load(db))
+            self._inflight.add_done_callback(self._clear_inflight)
+        # Shielded so a cancelled poller does not cancel the shared read
+        return await asyncio.shield(self._inflight)
+
+    async def increment(self, db, by: int = 1):
+        if by == 0:
+            return
+        await db.counters.update_one({"_id": self.collection}, {"$inc": {"value": by}}, upsert=True)
+        self.state.update(
+            self._key, lambda raw: _VALUE.pack(_VALUE.unpack(raw)[0] + by) if raw else b"", self.ttl
+        )
+
+    async def reconcile(self, db) -> int:
+        """Recount the source collection and overwrite the counter"""
+        value = await db[self.collection].count_documents({})
+        await db.counters.update_one({"_id": self.collection}, {"$set": {"value": value}}, upsert=True)
+        cached = self.cached()
+        if cached is not None and cached != value:
+            logger.info(f"Counter {self.collection} drifted by {cached - value}, reconciled")
+        self._store(value)
+        return value
+
+    async def reconcile_forever(self, db, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile(db)
+            except Exception as e:
+                logger.error(f"Counter reconciliation failed: {str(e)}")
+
+    async def _load(self, db) -> int:
+        self.reads += 1
+        doc = await db.counters.find_one({"_id": self.collection})
+        if doc is None:
+            return await self.reconcile(db)
+        self._store(doc["value"])
+        return doc["value"]
+
+    def _store(self, value: int):
+        self.state.set(self._key, _VALUE.pack(value), self.ttl)
+
+    def _clear_inflight(self, future):
+        self._inflight = None
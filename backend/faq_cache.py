@@ -0,0 +1,160 @@
+"""
+FAQ response cache for the chatbot.
+
+Questions are normalized, so "What is AetherX?" and "what's aetherx" share one
+cached answer. Exact repeats are a dict lookup; near-duplicates are a single
+vectorized NumPy comparison of MinHash signatures over the character shingles
+of the question's content words (stop words dropped), so "When is the launch
+date?" finds "What is the launch date?". A near-duplicate is only served when
+its content words are exactly the question's: a wrong cached answer reaches
+every visitor, so "launch city" or "not the launch date" must miss even when
+their spelling is close. Entries expire after a TTL and the table is bounded
+with LRU eviction.
+"""
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import FrozenSet, List, Optional
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACE = re.compile(r"\s+")
+
+# Function words carry no topic; negations such as "not" are deliberately kept
+STOP_WORDS = frozenset(
+    "a an and are at be can could do does for from how i in is it its me my of on or the there "
+    "this to what when where which who why will with you your".split()
+)
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = _PUNCT.sub("", text.lower().replace("'s", " is"))
+    return _SPACE.sub(" ", text).strip()
+
+
+def content_words(key: str) -> List[str]:
+    """Words of a normalized question other than stop words"""
+    return [w for w in key.split() if w not in STOP_WORDS]
+
+
+class MinHasher:
+    """MinHash signatures over character shingles"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        k = self.shingle_size
+        grams = {text[i:i + k] for i in range(max(len(text) - k + 1, 1))}
+        return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text) % _MERSENNE_PRIME
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class FAQCache:
+    """TTL + LRU answer cache with near-duplicate matching"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, threshold: float = 0.9,
+                 hasher: Optional[MinHasher] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        # normalized question -> (slot, answer, expires_at), in LRU order
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._signatures = np.zeros((max_entries, self.hasher.num_perm), dtype=np.uint32)
+        self._occupied = np.zeros(max_entries, dtype=bool)
+        self._slot_keys = [None] * max_entries
+        self._slot_words: List[Optional[FrozenSet[str]]] = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        if not key:
+            return None
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is None and self._entries:
+            key = self._nearest(key)
+            entry = self._entries.get(key) if key else None
+
+        if entry is None or entry[2] < now:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, question: str, answer: str):
+        key = normalize_question(question)
+        if not key:
+            return
+        if key in self._entries:
+            self._remove(key)
+        while not self._free_slots:
+            self._remove(next(iter(self._entries)))
+
+        slot = self._free_slots.pop()
+        words = content_words(key)
+        self._signatures[slot] = self.hasher.signature(" ".join(words) or key)
+        self._slot_keys[slot] = key
+        self._slot_words[slot] = frozenset(words)
+        self._occupied[slot] = True
+        self._entries[key] = (slot, answer, time.monotonic() + self.ttl)
+
+    def invalidate(self) -> int:
+        count = len(self._entries)
+        for key in list(self._entries):
+            self._remove(key)
+        return count
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _nearest(self, key: str) -> Optional[str]:
+        words = content_words(key)
+        if not words:
+            # Nothing but stop words ("what is it"): only an exact repeat is safe
+            return None
+        signature = self.hasher.signature(" ".join(words))
+        similarity = (self._signatures == signature).mean(axis=1)
+        similarity[~self._occupied] = 0.0
+        candidates = np.flatnonzero(similarity >= self.threshold)
+        wanted = frozenset(words)
+        for slot in candidates[np.argsort(-similarity[candidates], kind="stable")]:
+            if self._slot_words[slot] == wanted:
+                return self._slot_keys[slot]
+        return None
+
+    def _remove(self, key: str):
+        slot = self._entries.pop(key)[0]
+        self._slot_keys[slot] = None
+        self._slot_words[slot] = None
+        self._occupied[slot] = False
+        self._free_slots.append(slot)
@@ -0,0 +1,76 @@
+"""
+In-process cache for the launch configuration.
+
+The config document is rendered to JSON once and served with a strong ETag
+derived from its content until the cache expires or a write replaces it, so a
+countdown poll costs no Mongo round trip and a revalidation costs no body.
+Writes bump a version counter in the `StateBackend`, so with `MmapState` the
+other workers drop their copy on their next read instead of waiting out the TTL.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from state_backend import LocalState, StateBackend
+
+# Used only until an admin sets a date; persisted once so it does not drift
+DEFAULT_LAUNCH_DELAY = timedelta(days=30)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class LaunchConfigCache:
+    """Rendered launch config plus ETag, refreshed every `ttl` seconds"""
+
+    def __init__(self, ttl: float = 30.0, state: Optional[StateBackend] = None):
+        self.ttl = ttl
+        self.state = state if state is not None else LocalState()
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._expires = 0.0
+        self._version = 0
+
+    async def get(self, db) -> Tuple[bytes, str]:
+        version = self.state.counter("launch_config:version")
+        if self._body is None or time.monotonic() >= self._expires or version != self._version:
+            config = await db.launch_config.find_one({}, {"_id": 0})
+            if config is None:
+                config = await self._seed_default(db)
+            self._store(config)
+            self._version = version
+        return self._body, self._etag
+
+    async def set(self, db, doc: dict):
+        # replace_one on the single config document is atomic, so readers never see it missing
+        await db.launch_config.replace_one({}, doc, upsert=True)
+        self._store({k: v for k, v in doc.items() if k != "_id"})
+        self._version = self.state.incr("launch_config:version")
+
+    def invalidate(self):
+        self._body = None
+
+    async def _seed_default(self, db) -> dict:
+        now = datetime.now(timezone.utc)
+        default = {"launch_date": (now + DEFAULT_LAUNCH_DELAY).isoformat(), "updated_at": now}
+        await db.launch_config.update_one({}, {"$setOnInsert": default}, upsert=True)
+        return await db.launch_config.find_one({}, {"_id": 0})
+
+    def _store(self, config: dict):
+        self._body = json.dumps(config, default=_default, separators=(",", ":")).encode()
+        self._etag = '"' + hashlib.sha256(self._body).hexdigest()[:32] + '"'
+        self._expires = time.monotonic() + self.ttl
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,87 @@
+"""
+LLM providers for the chatbot.
+
+`EmergentLLMProvider` wraps `LlmChat`; `FakeLLMProvider` is a local stand-in with
+configurable latency and token rate so streaming and time-to-first-byte can be
+exercised offline. Select with `LLM_PROVIDER=emergent|fake`.
+"""
+import asyncio
+import importlib
+import os
+import re
+from typing import AsyncIterator, Optional
+
+LLM_MODEL = ("openai", "gpt-4o-mini")
+
+
+class EmergentLLMProvider:
+    """Emergent Integrations client (gpt-4o-mini)"""
+
+    name = "emergent"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def warm(self):
+        """Import the client library (and its HTTP stack) off the event loop, before the first request"""
+        await asyncio.to_thread(importlib.import_module, "emergentintegrations.llm.chat")
+
+    async def complete(self, session_id: str, system_message: str, prompt: str) -> str:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(*LLM_MODEL)
+        return await chat.send_message(UserMessage(text=prompt))
+
+    async def stream(self, session_id: str, system_message: str, prompt: str) -> AsyncIterator[str]:
+        # LlmChat has no token stream, so the completion is emitted as one chunk
+        yield await self.complete(session_id, system_message, prompt)
+
+
+class FakeLLMProvider:
+    """Offline provider that answers after `latency` seconds at `tokens_per_second`"""
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.05, tokens_per_second: float = 200.0, reply: Optional[str] = None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply = reply or (
+            "AetherX is launching soon! Join the waitlist to get early access "
+            "and be the first to experience the future of AI-powered creativity."
+        )
+        self.calls = 0
+
+    def _tokens(self):
+        return re.findall(r"\S+\s*", self.reply)
+
+    async def warm(self):
+        pass
+
+    async def complete(self, session_id: str, system_message: str, prompt: str) -> str:
+        self.calls += 1
+        tokens = self._tokens()
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return self.reply
+
+    async def stream(self, session_id: str, system_message: str, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        delay = 1.0 / self.tokens_per_second
+        for token in self._tokens():
+            await asyncio.sleep(delay)
+            yield token
+
+
+def get_llm_provider():
+    """Build the provider selected by the environment"""
+    kind = os.environ.get('LLM_PROVIDER', 'emergent')
+    if kind == 'fake':
+        return FakeLLMProvider(
+            latency=float(os.environ.get('FAKE_LLM_LATENCY', '0.05')),
+            tokens_per_second=float(os.environ.get('FAKE_LLM_TOKENS_PER_SECOND', '200')),
+        )
+    return EmergentLLMProvider(api_key=os.environ.get('EMERGENT_LLM_KEY', ''))
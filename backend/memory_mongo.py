@@ -0,0 +1,533 @@
+"""
+In-memory stand-in for the subset of Motor used by the API.
+
+Used by the benchmark harness and offline tests to run the app without a
+MongoDB server. Supports equality and comparison queries (`$gt`, `$gte`,
+`$lt`, `$lte`, `$in`, `$ne`, `$exists`, `$type`, `$or`, `$and`), projections,
+sorting, unique indexes, the `$set` / `$inc` / `$setOnInsert` update
+operators, a rough `$text` match and aggregation pipelines made of `$match`,
+`$sort`, `$group`, `$project`, `$skip` and `$limit`, with `$toLong` / `$mod` /
+`$subtract` date arithmetic, `$ifNull` and `$slice` in expressions. An
+optional per-operation `latency` simulates a network round trip.
+"""
+import asyncio
+import copy
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult,
+)
+
+_MISSING = object()
+_TYPES = {"string": str, "date": datetime}
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value, op: str, arg) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$ne":
+        return value != arg
+    if op == "$in":
+        return value in arg
+    if op == "$nin":
+        return value not in arg
+    if op == "$type":
+        return isinstance(value, _TYPES[arg])
+    if op == "$regex":
+        return isinstance(value, str) and re.search(arg, value) is not None
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:
+        # Mongo never matches comparisons across BSON types
+        return False
+    raise NotImplementedError(f"Query operator {op} is not supported")
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif key == "$text":
+            if not _text_match(doc, cond["$search"]):
+                return False
+        elif isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            value = _get(doc, key)
+            if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                return False
+        elif _get(doc, key) != cond:
+            return False
+    return True
+
+
+def _text_match(doc: dict, search: str) -> bool:
+    # Any listed word against any string field, with a crude stand-in for stemming
+    words = set(re.findall(r"\w+", " ".join(v for v in doc.values() if isinstance(v, str)).lower()))
+    for term in re.findall(r"-?\w+", search.lower()):
+        if term.startswith("-"):
+            continue
+        stem = term[:max(4, len(term) - 3)]
+        if any(w.startswith(stem) or term.startswith(w) and len(w) >= 4 for w in words):
+            return True
+    return False
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        out = {k: doc[k] for k in fields if k in doc}
+        if include_id and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    for k, v in fields.items():
+        if not v:
+            doc.pop(k, None)
+    if not include_id:
+        doc.pop("_id", None)
+    return doc
+
+
+def _project_stage(doc: dict, spec: dict) -> dict:
+    # Inclusions and computed fields only; `_id` is kept unless excluded
+    out = {} if spec.get("_id", 1) in (0, False) else {"_id": doc.get("_id")}
+    for field, value in spec.items():
+        if field == "_id":
+            continue
+        if value in (1, True):
+            if field in doc:
+                out[field] = doc[field]
+        else:
+            out[field] = _eval(doc, value)
+    return out
+
+
+def _sort_key(value):
+    # None/missing sort first, then by type so mixed types never compare directly
+    if value is _MISSING or value is None:
+        return (0, "", 0)
+    if isinstance(value, (int, float)):
+        return (1, "", value)
+    return (2, type(value).__name__, value)
+
+
+def _sort_docs(docs: List[dict], keys) -> None:
+    for key, direction in reversed(keys):
+        docs.sort(key=lambda d: _sort_key(_get(d, key)), reverse=direction < 0)
+
+
+def _eval(doc: dict, expr):
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, dict):
+        if len(expr) == 1 and next(iter(expr)).startswith("$"):
+            (op, args), = expr.items()
+            return _operator(op, [_eval(doc, a) for a in args] if isinstance(args, list) else _eval(doc, args))
+        return {k: _eval(doc, v) for k, v in expr.items()}
+    return expr
+
+
+def _operator(op: str, args):
+    # Dates behave as milliseconds since the epoch, as in the server's date arithmetic
+    if op == "$toLong":
+        return int(args.timestamp() * 1000) if isinstance(args, datetime) else int(args)
+    if op == "$ifNull":
+        return next((a for a in args if a is not None), None)
+    if op == "$slice":
+        return args[0][:args[1]] if args[1] >= 0 else args[0][args[1]:]
+    if op == "$mod":
+        return args[0] % args[1]
+    if op == "$subtract":
+        a, b = args
+        if isinstance(a, datetime) and isinstance(b, datetime):
+            return int((a - b).total_seconds() * 1000)
+        if isinstance(a, datetime):
+            return a - timedelta(milliseconds=b)
+        return a - b
+    raise NotImplementedError(f"Expression operator {op} is not supported")
+
+
+def _accumulate(op: str, docs: List[dict], expr):
+    values = [_eval(d, expr) for d in docs]
+    if op == "$sum":
+        return sum(v for v in values if isinstance(v, (int, float)))
+    if op in ("$max", "$min"):
+        present = [v for v in values if v is not None]
+        if not present:
+            return None
+        pick = max if op == "$max" else min
+        return pick(present, key=_sort_key)
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    if op == "$push":
+        return values
+    if op == "$addToSet":
+        unique = []
+        for v in values:
+            if v not in unique:
+                unique.append(v)
+        return unique
+    raise NotImplementedError(f"Accumulator {op} is not supported")
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    groups: Dict[Any, List[dict]] = {}
+    keys: Dict[Any, Any] = {}
+    for doc in docs:
+        key = _eval(doc, spec["_id"])
+        # dict keys are not hashable; group on their items instead
+        hashable = tuple(sorted(key.items())) if isinstance(key, dict) else key
+        groups.setdefault(hashable, []).append(doc)
+        keys[hashable] = key
+    out = []
+    for hashable, members in groups.items():
+        result = {"_id": keys[hashable]}
+        for field, acc in spec.items():
+            if field != "_id":
+                (op, expr), = acc.items()
+                result[field] = _accumulate(op, members, expr)
+        out.append(result)
+    return out
+
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", docs: List[dict], projection: Optional[dict]):
+        self._collection = collection
+        self._docs = docs
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction: int = 1):
+        keys = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction)]
+        _sort_docs(self._docs, keys)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def _window(self) -> List[dict]:
+        docs = self._docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: Optional[int]):
+        await self._collection._round_trip()
+        docs = self._window()
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await self._collection._round_trip()
+        for doc in self._window():
+            yield doc
+
+
+class MemoryCollection:
+    def __init__(self, name: str, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.docs: List[dict] = []
+        self._unique: Dict[str, tuple] = {}
+        self._unique_keys: Dict[str, set] = {}
+        self._indexes: Dict[str, dict] = {}
+
+    async def _round_trip(self):
+        await asyncio.sleep(self.latency)
+
+    def _unique_key(self, doc: dict, fields: tuple) -> tuple:
+        return tuple(_get(doc, f) for f in fields)
+
+    def _check_unique(self, doc: dict, ignore: Optional[dict] = None):
+        for name, fields in self._unique.items():
+            key = self._unique_key(doc, fields)
+            if key in self._unique_keys[name] and (ignore is None or self._unique_key(ignore, fields) != key):
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {name}", 11000)
+
+    def _index_doc(self, doc: dict, add: bool):
+        for name, fields in self._unique.items():
+            keys = self._unique_keys[name]
+            key = self._unique_key(doc, fields)
+            if add:
+                keys.add(key)
+            else:
+                keys.discard(key)
+
+    def _store(self, index: Optional[int], stored: dict, ignore: Optional[dict] = None):
+        self._check_unique(stored, ignore)
+        if ignore is not None:
+            self._index_doc(ignore, add=False)
+        self._index_doc(stored, add=True)
+        if index is None:
+            self.docs.append(stored)
+        else:
+            self.docs[index] = stored
+
+    def _insert(self, doc: dict) -> Any:
+        doc.setdefault("_id", ObjectId())
+        self._store(None, copy.deepcopy(doc))
+        return doc["_id"]
+
+    def _apply_update(self, doc: dict, update: dict, inserting: bool):
+        for op, fields in update.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                for k, v in fields.items():
+                    doc[k] = copy.deepcopy(v)
+            elif op == "$inc":
+                for k, v in fields.items():
+                    doc[k] = doc.get(k, 0) + v
+            elif op != "$setOnInsert":
+                raise NotImplementedError(f"Update operator {op} is not supported")
+
+    def _upsert_doc(self, query: dict, update: dict) -> dict:
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        self._apply_update(doc, update, inserting=True)
+        return doc
+
+    def _update(self, query: dict, update: dict, upsert: bool):
+        """Returns (matched doc before update, stored doc after update, upserted_id)"""
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                candidate = copy.deepcopy(doc)
+                self._apply_update(candidate, update, inserting=False)
+                self._store(i, candidate, ignore=doc)
+                return doc, candidate, None
+        if not upsert:
+            return None, None, None
+        doc = self._upsert_doc(query, update)
+        upserted_id = self._insert(doc)
+        return None, self.docs[-1], upserted_id
+
+    # Reads
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None):
+        docs = [d for d in self.docs if matches(d, query or {})]
+        return MemoryCursor(self, docs, projection)
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None):
+        await self._round_trip()
+        for doc in self.docs:
+            if matches(doc, query or {}):
+                return _project(doc, projection)
+        return None
+
+    def aggregate(self, pipeline: List[dict], **kwargs):
+        docs = list(self.docs)
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if matches(d, arg)]
+            elif op == "$sort":
+                docs = list(docs)
+                _sort_docs(docs, list(arg.items()))
+            elif op == "$group":
+                docs = _group(docs, arg)
+            elif op == "$project":
+                docs = [_project_stage(d, arg) for d in docs]
+            elif op == "$skip":
+                docs = docs[arg:]
+            elif op == "$limit":
+                docs = docs[:arg]
+            else:
+                raise NotImplementedError(f"Pipeline stage {op} is not supported")
+        return MemoryCursor(self, docs, None)
+
+    async def count_documents(self, query: dict):
+        await self._round_trip()
+        return sum(1 for d in self.docs if matches(d, query))
+
+    # Writes
+    async def insert_one(self, doc: dict):
+        await self._round_trip()
+        return InsertOneResult(self._insert(doc), True)
+
+    async def insert_many(self, docs: List[dict], ordered: bool = True):
+        await self._round_trip()
+        inserted, errors = [], []
+        for i, doc in enumerate(docs):
+            try:
+                inserted.append(self._insert(doc))
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return InsertManyResult(inserted, True)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        await self._round_trip()
+        before, _, upserted_id = self._update(query, update, upsert)
+        raw = {"n": 1 if before is not None or upserted_id is not None else 0,
+               "nModified": 1 if before is not None else 0}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def update_many(self, query: dict, update: dict):
+        await self._round_trip()
+        n = 0
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                candidate = copy.deepcopy(doc)
+                self._apply_update(candidate, update, inserting=False)
+                self._store(i, candidate, ignore=doc)
+                n += 1
+        return UpdateResult({"n": n, "nModified": n}, True)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection: Optional[dict] = None,
+                                  upsert: bool = False, return_document=ReturnDocument.BEFORE, **kwargs):
+        await self._round_trip()
+        before, after, _ = self._update(query, update, upsert)
+        result = after if return_document == ReturnDocument.AFTER else before
+        return None if result is None else _project(result, projection)
+
+    async def find_one_and_delete(self, query: dict, projection: Optional[dict] = None, **kwargs):
+        await self._round_trip()
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                self._index_doc(doc, add=False)
+                del self.docs[i]
+                return _project(doc, projection)
+        return None
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        await self._round_trip()
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                stored = copy.deepcopy(replacement)
+                stored["_id"] = doc["_id"]
+                self._store(i, stored, ignore=doc)
+                return UpdateResult({"n": 1, "nModified": 1}, True)
+        if upsert:
+            upserted_id = self._insert(dict(replacement))
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": upserted_id}, True)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    async def delete_one(self, query: dict):
+        await self._round_trip()
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                self._index_doc(doc, add=False)
+                del self.docs[i]
+                return DeleteResult({"n": 1}, True)
+        return DeleteResult({"n": 0}, True)
+
+    async def delete_many(self, query: dict):
+        await self._round_trip()
+        kept = []
+        for doc in self.docs:
+            if matches(doc, query):
+                self._index_doc(doc, add=False)
+            else:
+                kept.append(doc)
+        n = len(self.docs) - len(kept)
+        self.docs = kept
+        return DeleteResult({"n": n}, True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        await self._round_trip()
+        matched = modified = deleted = 0
+        for request in requests:
+            if isinstance(request, DeleteOne):
+                for i, doc in enumerate(self.docs):
+                    if matches(doc, request._filter):
+                        self._index_doc(doc, add=False)
+                        del self.docs[i]
+                        deleted += 1
+                        break
+                continue
+            before, _, _ = self._update(request._filter, request._doc, request._upsert)
+            if before is not None:
+                matched += 1
+                modified += 1
+        return BulkWriteResult({"nMatched": matched, "nModified": modified, "nRemoved": deleted, "upserted": []}, True)
+
+    # Indexes
+    async def create_index(self, keys, name: Optional[str] = None, unique: bool = False, **kwargs):
+        keys = keys if isinstance(keys, list) else [(keys, 1)]
+        name = name or "_".join(f"{k}_{d}" for k, d in keys)
+        if unique and name not in self._unique:
+            fields = tuple(k for k, _ in keys)
+            existing = [self._unique_key(d, fields) for d in self.docs]
+            if len(set(existing)) != len(existing):
+                raise DuplicateKeyError(f"E11000 duplicate key error building index: {name}", 11000)
+            self._unique[name] = fields
+            self._unique_keys[name] = set(existing)
+        self._indexes[name] = {"key": keys, "unique": unique, **kwargs}
+        return name
+
+    async def drop_index(self, name: str):
+        if name not in self._indexes:
+            raise OperationFailure(f"index not found with name [{name}]", 27)
+        del self._indexes[name]
+        self._unique.pop(name, None)
+        self._unique_keys.pop(name, None)
+
+    async def index_information(self):
+        return dict(self._indexes)
+
+
+class MemoryDatabase:
+    """Attribute/item access to lazily created in-memory collections"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name, self.latency)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, command: str, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {"ok": 1.0}
@@ -0,0 +1,103 @@
+"""
+Bulk CSV import of newsletter subscribers.
+
+The request body is consumed as a stream of byte chunks and parsed line by
+line, so memory stays flat regardless of file size. Rows are inserted in
+chunks with `insert_many(ordered=False)`; duplicate emails are rejected by the
+unique `email` index and counted rather than failing the import.
+"""
+import codecs
+import csv
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY = 11000
+
+# Cheap shape check; full RFC validation per row would dominate import time
+_EMAIL = re.compile(r"^[^@\s,;]+@[^@\s,;]+\.[^@\s,;]+$")
+
+
+def normalize_email(value: str) -> Optional[str]:
+    value = value.strip().strip('"')
+    if not _EMAIL.match(value):
+        return None
+    local, domain = value.rsplit("@", 1)
+    return f"{local}@{domain.lower()}"
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[List[str]]]:
+    """Yield the complete CSV rows contained in each chunk of a byte stream"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        yield [row for row in csv.reader(lines) if row]
+    buffer += decoder.decode(b"", final=True)
+    yield [row for row in csv.reader([buffer]) if row]
+
+
+async def import_subscriber_csv(collection, chunks: AsyncIterator[bytes], source: str = "import",
+                                batch_size: int = 1000,
+                                on_insert: Optional[Callable[[List[dict]], Awaitable[None]]] = None) -> dict:
+    """Stream a CSV of emails (optional header with `email` / `name` columns) into the collection
+
+    `on_insert` is awaited with the documents of each batch that were actually inserted.
+    """
+    stats = {"inserted": 0, "duplicates": 0, "invalid": 0, "failed": 0}
+    email_col, name_col = 0, None
+    batch = []
+    first = True
+
+    async def flush():
+        rejected = set()
+        try:
+            result = await collection.insert_many(batch, ordered=False)
+            stats["inserted"] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicates = sum(1 for err in errors if err.get("code") == DUPLICATE_KEY)
+            stats["duplicates"] += duplicates
+            stats["failed"] += len(errors) - duplicates
+            stats["inserted"] += e.details.get("nInserted", len(batch) - len(errors))
+            rejected = {err.get("index") for err in errors}
+        if on_insert is not None:
+            await on_insert([doc for i, doc in enumerate(batch) if i not in rejected])
+        batch.clear()
+
+    async for rows in iter_csv_rows(chunks):
+        if first and rows:
+            first = False
+            header = [cell.strip().lower() for cell in rows[0]]
+            if "email" in header:
+                email_col = header.index("email")
+                name_col = header.index("name") if "name" in header else None
+                rows = rows[1:]
+
+        subscribed_at = datetime.now(timezone.utc)
+        for row in rows:
+            email = normalize_email(row[email_col]) if len(row) > email_col else None
+            if email is None:
+                stats["invalid"] += 1
+                continue
+            name = None
+            if name_col is not None and len(row) > name_col:
+                name = row[name_col].strip() or None
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "email": email,
+                "name": name,
+                "subscribed_at": subscribed_at,
+                "source": source,
+            })
+            if len(batch) >= batch_size:
+                await flush()
+
+    if batch:
+        await flush()
+    return stats
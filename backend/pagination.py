@@ -0,0 +1,87 @@
+"""
+Keyset pagination and streaming export for admin list endpoints.
+
+Pages are ordered on `(time_field, id)` and continue from an opaque cursor
+holding the last row's key, so every page is an index range scan no matter how
+deep it is. Exports iterate the Motor cursor and emit NDJSON or CSV in small
+batches, keeping memory flat for any collection size.
+"""
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+EXPORT_BATCH = 500
+
+
+def encode_cursor(doc: dict, time_field: str) -> str:
+    value = doc[time_field]
+    key = {"t": value.isoformat() if isinstance(value, datetime) else value, "i": doc["id"]}
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(key["t"]), key["i"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_query(time_field: str, cursor: Optional[str]) -> dict:
+    if not cursor:
+        return {}
+    after_time, after_id = decode_cursor(cursor)
+    return {"$or": [
+        {time_field: {"$gt": after_time}},
+        {time_field: after_time, "id": {"$gt": after_id}},
+    ]}
+
+
+async def fetch_page(collection, time_field: str, limit: int,
+                     cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Return one page of documents and the cursor for the next page (None on the last page)"""
+    docs = await collection.find(
+        keyset_query(time_field, cursor),
+        {"_id": 0}
+    ).sort([(time_field, 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], time_field)
+
+
+def _to_text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def export_rows(cursor, fmt: str, fields: List[str]) -> AsyncIterator[str]:
+    """Stream a Motor cursor as NDJSON or CSV text"""
+    batch = []
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        async for doc in cursor:
+            writer.writerow([_to_text(doc[f]) if doc.get(f) is not None else "" for f in fields])
+            if out.tell() > EXPORT_BATCH * 64:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+        return
+
+    async for doc in cursor:
+        batch.append(json.dumps({f: doc.get(f) for f in fields}, default=_to_text))
+        if len(batch) >= EXPORT_BATCH:
+            yield "\n".join(batch) + "\n"
+            batch.clear()
+    if batch:
+        yield "\n".join(batch) + "\n"
@@ -0,0 +1,173 @@
+"""
+On-demand request profiling.
+
+A sampled request gets a sampler thread that periodically walks the request
+task's coroutine chain. Unlike cProfile, which only sees on-CPU frames of the
+whole thread, this attributes time to the request even while it is suspended
+awaiting Motor or the LLM client (leaf frames show what is being awaited).
+Profiles are kept as folded stacks (`frame;frame;frame count`), the input
+format of flamegraph.pl and speedscope, in a bounded ring buffer.
+
+The middleware is only installed when profiling is configured, so it costs
+nothing otherwise.
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import List, Optional
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _coroutine_frame(obj):
+    return getattr(obj, "cr_frame", None) or getattr(obj, "ag_frame", None) or getattr(obj, "gi_frame", None)
+
+
+def _awaiting(obj):
+    return getattr(obj, "cr_await", None) or getattr(obj, "ag_await", None) or getattr(obj, "gi_yieldfrom", None)
+
+
+def task_stack(task: asyncio.Task, thread_id: int) -> List[str]:
+    """Outermost-first stack of a task, whether it is running or suspended"""
+    stack = []
+    coro = task.get_coro()
+    innermost = None
+    while coro is not None:
+        frame = _coroutine_frame(coro)
+        if frame is None:
+            break
+        stack.append(_label(frame))
+        innermost = frame
+        awaited = _awaiting(coro)
+        if awaited is not None and _coroutine_frame(awaited) is None:
+            # Suspended on a future / I/O: name what is being awaited
+            stack.append(f"<await {type(awaited).__name__}>")
+            return stack
+        coro = awaited
+
+    # Running on the loop thread: add the synchronous frames below the innermost coroutine
+    current = sys._current_frames().get(thread_id)
+    if innermost is not None and current is not None:
+        sync_frames = []
+        frame = current
+        while frame is not None and frame is not innermost:
+            sync_frames.append(_label(frame))
+            frame = frame.f_back
+        if frame is innermost:
+            stack.extend(reversed(sync_frames))
+    return stack
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self.duration = 0.0
+        self.status = 0
+        self.samples: Counter = Counter()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "samples": sum(self.samples.values()),
+        }
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, task: asyncio.Task, thread_id: int, profile: RequestProfile, interval: float):
+        super().__init__(daemon=True, name=f"profiler-{profile.id}")
+        self.task = task
+        self.thread_id = thread_id
+        self.profile = profile
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                stack = task_stack(self.task, self.thread_id)
+            except Exception:
+                # Frames can change under us while the loop runs; skip the sample
+                continue
+            if stack:
+                self.profile.samples[";".join(stack)] += 1
+
+
+class ProfileStore:
+    """Ring buffer of the most recent request profiles"""
+
+    def __init__(self, capacity: int = 20):
+        self._profiles = deque(maxlen=capacity)
+
+    def add(self, profile: RequestProfile):
+        self._profiles.append(profile)
+
+    def list(self) -> List[dict]:
+        return [p.summary() for p in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        for profile in self._profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+
+class ProfilingMiddleware:
+    """Samples requests carrying `X-Profile: <token>` or a random `sample_rate` fraction"""
+
+    def __init__(self, app, store: ProfileStore, token: str = "", sample_rate: float = 0.0,
+                 interval: float = 0.005):
+        self.app = app
+        self.store = store
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.interval = interval
+
+    def _wanted(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile" and value == self.token:
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        sampler = _Sampler(asyncio.current_task(), threading.get_ident(), profile, self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stopped.set()
+            profile.duration = time.perf_counter() - start
+            self.store.add(profile)
@@ -0,0 +1,237 @@
+"""
+Clustering of the questions visitors ask the chatbot.
+
+A batch job over the `user` turns in `chat_history`, streamed in chunks of
+`chunk_size` so memory depends on the settings rather than on the collection:
+
+1. Document frequencies of hashed word unigrams and bigrams (`n_features` ints).
+   A reservoir sample of `chunk_size` questions is kept for k-means++ seeding.
+2. Mini-batch spherical k-means over L2-normalized TF-IDF vectors. Chunks stay
+   sparse (CSR arrays); only the `k x n_features` centroids are dense.
+3. A final assignment pass with the trained centroids counts each cluster and
+   keeps its `per_cluster` questions closest to the centroid.
+
+The `top` largest clusters are stored as one document in `question_clusters`.
+Archived sessions are not included.
+"""
+import asyncio
+import heapq
+import logging
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from faq_cache import content_words, normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Sparse chunk: row offsets, feature indices, values
+Sparse = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def hashed_features(text: str, n_features: int) -> Dict[int, int]:
+    """Term counts of a question's words and word pairs, hashed into `n_features` buckets"""
+    # Stop words would dominate the vectors of short questions
+    words = content_words(normalize_question(text))
+    counts: Dict[int, int] = {}
+    for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        feature = zlib.crc32(term.encode()) % n_features
+        counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+
+class QuestionClusterer:
+    """Hashing-trick TF-IDF and mini-batch k-means over user questions"""
+
+    def __init__(self, k: int = 30, n_features: int = 1 << 16, chunk_size: int = 2000,
+                 top: int = 20, per_cluster: int = 5, seed: int = 1):
+        self.k = k
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+        self.top = top
+        self.per_cluster = per_cluster
+        self.seed = seed
+        self.running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def _chunks(self, db) -> AsyncIterator[List[str]]:
+        cursor = db.chat_history.find({"role": "user"}, {"_id": 0, "content": 1}).batch_size(self.chunk_size)
+        chunk = []
+        async for doc in cursor:
+            # Questions with no words would all land in one cluster
+            if doc.get("content") and normalize_question(doc["content"]):
+                chunk.append(doc["content"])
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    # Vectorizing
+    def _document_frequencies(self, texts: List[str], df: np.ndarray, sample: List[str], seen: int,
+                              rng: np.random.Generator):
+        """Count features per question and keep a reservoir sample of `chunk_size` questions"""
+        for i, text in enumerate(texts, seen):
+            df[list(hashed_features(text, self.n_features))] += 1
+            if len(sample) < self.chunk_size:
+                sample.append(text)
+            else:
+                slot = int(rng.integers(i + 1))
+                if slot < self.chunk_size:
+                    sample[slot] = text
+
+    def _vectorize(self, texts: List[str], idf: np.ndarray) -> Sparse:
+        indptr = [0]
+        cols: List[int] = []
+        counts: List[int] = []
+        for text in texts:
+            features = hashed_features(text, self.n_features)
+            cols.extend(features)
+            counts.extend(features.values())
+            indptr.append(len(cols))
+        indptr = np.array(indptr, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        vals = (1.0 + np.log(np.array(counts, dtype=np.float32))) * idf[cols]
+        # L2-normalize each row so dot products are cosine similarities
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        norms = np.sqrt(np.bincount(rows, weights=vals * vals, minlength=len(texts)))
+        vals = vals / np.maximum(norms, 1e-12)[rows]
+        return indptr, cols, vals.astype(np.float32)
+
+    @staticmethod
+    def _similarities(chunk: Sparse, centroids: np.ndarray) -> np.ndarray:
+        """Rows x clusters cosine similarities of a sparse chunk"""
+        indptr, cols, vals = chunk
+        n = len(indptr) - 1
+        sims = np.zeros((n, len(centroids)), dtype=np.float32)
+        nonempty = np.diff(indptr) > 0
+        if nonempty.any():
+            # Rows are contiguous runs of entries, so per-row sums are one reduceat
+            contributions = vals[:, None] * centroids[:, cols].T
+            sims[nonempty] = np.add.reduceat(contributions, indptr[:-1][nonempty], axis=0)
+        return sims
+
+    # Clustering
+    def _row(self, chunk: Sparse, row: int) -> np.ndarray:
+        indptr, cols, vals = chunk
+        dense = np.zeros(self.n_features, dtype=np.float32)
+        dense[cols[indptr[row]:indptr[row + 1]]] = vals[indptr[row]:indptr[row + 1]]
+        return dense
+
+    def _init_centroids(self, chunk: Sparse, rng: np.random.Generator) -> np.ndarray:
+        """k-means++ seeding from a sample of the questions"""
+        n = len(chunk[0]) - 1
+        k = min(self.k, n)
+        centroids = np.zeros((k, self.n_features), dtype=np.float32)
+        centroids[0] = self._row(chunk, int(rng.integers(n)))
+        distance = 1.0 - self._similarities(chunk, centroids[:1])[:, 0]
+        for c in range(1, k):
+            weights = np.maximum(distance, 0).astype(np.float64)
+            total = weights.sum()
+            pick = int(rng.choice(n, p=weights / total)) if total > 0 else int(rng.integers(n))
+            centroids[c] = self._row(chunk, pick)
+            distance = np.minimum(distance, 1.0 - self._similarities(chunk, centroids[c:c + 1])[:, 0])
+        return centroids
+
+    def _update(self, chunk: Sparse, centroids: np.ndarray, seen: np.ndarray):
+        """One mini-batch step: move each centroid toward the mean of its new members"""
+        indptr, cols, vals = chunk
+        assign = self._similarities(chunk, centroids).argmax(axis=1)
+        members = np.bincount(assign, minlength=len(centroids))
+        rows = np.repeat(np.arange(len(assign)), np.diff(indptr))
+        # Scatter-add of every entry into its cluster's row, as one flat bincount
+        sums = np.bincount(
+            assign[rows] * self.n_features + cols, weights=vals, minlength=centroids.size
+        ).reshape(centroids.shape).astype(np.float32)
+        seen += members
+        moved = members > 0
+        # Per-center learning rate 1 / (points seen), applied to the batch at once
+        centroids[moved] += (sums[moved] - members[moved, None] * centroids[moved]) / seen[moved, None]
+        norms = np.linalg.norm(centroids[moved], axis=1, keepdims=True)
+        centroids[moved] /= np.maximum(norms, 1e-12)
+
+    def _assign(self, texts: List[str], chunk: Sparse, centroids: np.ndarray,
+                counts: np.ndarray, best: List[list]):
+        sims = self._similarities(chunk, centroids)
+        assign = sims.argmax(axis=1)
+        counts += np.bincount(assign, minlength=len(centroids))
+        for text, cluster, sim in zip(texts, assign, sims[np.arange(len(texts)), assign]):
+            heap = best[cluster]
+            key = normalize_question(text)
+            if any(entry[1] == key for entry in heap):
+                continue
+            if len(heap) < self.per_cluster:
+                heapq.heappush(heap, (float(sim), key, text))
+            elif sim > heap[0][0]:
+                heapq.heapreplace(heap, (float(sim), key, text))
+
+    async def run(self, db) -> dict:
+        """Cluster every user question and store the largest clusters"""
+        started = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+
+        df = np.zeros(self.n_features, dtype=np.int64)
+        sample: List[str] = []
+        documents = 0
+        async for texts in self._chunks(db):
+            await asyncio.to_thread(self._document_frequencies, texts, df, sample, documents, rng)
+            documents += len(texts)
+        if not documents:
+            return await self._store(db, {"documents": 0, "clusters": []}, started)
+        idf = (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+
+        # Seeds come from a uniform sample, so they are not all from the oldest topics
+        centroids = self._init_centroids(await asyncio.to_thread(self._vectorize, sample, idf), rng)
+        seen = np.zeros(len(centroids), dtype=np.float32)
+        async for texts in self._chunks(db):
+            chunk = await asyncio.to_thread(self._vectorize, texts, idf)
+            await asyncio.to_thread(self._update, chunk, centroids, seen)
+
+        counts = np.zeros(len(centroids), dtype=np.int64)
+        best: List[list] = [[] for _ in range(len(centroids))]
+        async for texts in self._chunks(db):
+            chunk = await asyncio.to_thread(self._vectorize, texts, idf)
+            await asyncio.to_thread(self._assign, texts, chunk, centroids, counts, best)
+
+        clusters = [
+            {
+                "count": int(counts[c]),
+                "share": float(counts[c] / documents),
+                "questions": [text for _, _, text in sorted(best[c], reverse=True)],
+            }
+            for c in np.argsort(-counts)[:self.top] if counts[c]
+        ]
+        return await self._store(db, {"documents": documents, "clusters": clusters}, started)
+
+    async def _store(self, db, result: dict, started: float) -> dict:
+        result = {
+            **result,
+            "k": self.k,
+            "built_at": datetime.now(timezone.utc),
+            "seconds": time.perf_counter() - started,
+        }
+        await db.question_clusters.replace_one({"_id": "latest"}, {"_id": "latest", **result}, upsert=True)
+        logger.info(f"Clustered {result['documents']} questions in {result['seconds']:.1f}s")
+        return result
+
+    def start(self, db) -> bool:
+        """Run in the background unless a run is already going; False if one is"""
+        if self.running:
+            return False
+        self.running = True
+        self._task = asyncio.create_task(self._run_logged(db))
+        return True
+
+    async def _run_logged(self, db):
+        try:
+            await self.run(db)
+        except Exception:
+            logger.exception("Question clustering failed")
+        finally:
+            self.running = False
+
+    async def latest(self, db) -> Optional[dict]:
+        return await db.question_clusters.find_one({"_id": "latest"}, {"_id": 0})
@@ -0,0 +1,133 @@
+"""
+In-process rate limiting.
+
+Token buckets keyed per client IP, per chat session or globally. Client buckets
+are checked at the top of a handler before it touches Mongo or the LLM; global
+ones guard the upstream call itself, so answers that need no call are not
+counted against them. Buckets live in the
+bounded table of a `StateBackend` (shared by all workers with `MmapState`):
+every operation is O(1) and the coldest keys are dropped when it fills. A
+dropped key comes back with a full bucket, which only matters for keys idle
+long enough to have refilled anyway, so the eviction is approximate rather
+than wrong.
+"""
+import math
+import struct
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from metrics import RATE_LIMITED
+from state_backend import LocalState, StateBackend
+
+
+def parse_rate(spec: str) -> Optional[Tuple[float, float]]:
+    """Parse "30/60" (30 requests per 60 seconds) into (tokens per second, burst); "" or "0" disables"""
+    if not spec or spec == "0":
+        return None
+    count, _, seconds = spec.partition("/")
+    count, seconds = float(count), float(seconds or 1)
+    return count / seconds, count
+
+
+_BUCKET = struct.Struct("<dd")  # tokens, last refill (monotonic clocks are host-wide on Linux)
+
+
+class TokenBuckets:
+    """Token buckets per key, stored in a bounded state backend table"""
+
+    def __init__(self, rate: float, burst: float, state: Optional[StateBackend] = None,
+                 prefix: str = "", clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.state = state if state is not None else LocalState()
+        self.prefix = prefix
+        self.clock = clock
+
+    def _refill(self, raw: Optional[bytes], now: float) -> float:
+        if raw is None:
+            return self.burst
+        tokens, updated = _BUCKET.unpack(raw)
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def wait(self, key: str, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (0 when they are now)"""
+        tokens = self._refill(self.state.get(self.prefix + key), self.clock())
+        return 0.0 if tokens >= cost else (cost - tokens) / self.rate
+
+    def take(self, key: str, cost: float = 1.0):
+        now = self.clock()
+
+        def spend(raw: Optional[bytes]) -> bytes:
+            return _BUCKET.pack(max(self._refill(raw, now) - cost, 0.0), now)
+
+        # A bucket left alone for burst / rate seconds is full again, so it may expire
+        self.state.update(self.prefix + key, spend, ttl=self.burst / self.rate)
+
+
+def client_ip(request: Request, forwarded_hops: int = 0) -> str:
+    """Client address, taken from X-Forwarded-For when behind `forwarded_hops` trusted proxies"""
+    if forwarded_hops:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            hops = [h.strip() for h in forwarded.split(",")]
+            # Entries left of what our own proxies appended are client-controlled
+            return hops[-min(forwarded_hops, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """Per-route token buckets scoped by "ip", "session" or "global" """
+
+    def __init__(self, routes: Dict[str, Dict[str, Optional[Tuple[float, float]]]],
+                 state: Optional[StateBackend] = None, forwarded_hops: int = 0):
+        self.forwarded_hops = forwarded_hops
+        self.state = state if state is not None else LocalState()
+        self.routes = {
+            route: {
+                scope: TokenBuckets(*limit, state=self.state, prefix=f"rl:{route}:{scope}:")
+                for scope, limit in scopes.items() if limit
+            }
+            for route, scopes in routes.items()
+        }
+        self.rejected: Dict[Tuple[str, str], int] = {}
+
+    def check(self, route: str, request: Optional[Request] = None, session_id: Optional[str] = None):
+        """Spend one token from every bucket of `route`, or raise 429 without spending any"""
+        buckets = self.routes.get(route)
+        if not buckets:
+            return
+        keys = {
+            "ip": client_ip(request, self.forwarded_hops) if request is not None else None,
+            "session": session_id,
+            "global": "",
+        }
+        wanted = [(scope, bucket, keys[scope]) for scope, bucket in buckets.items() if keys[scope] is not None]
+
+        for scope, bucket, key in wanted:
+            wait = bucket.wait(key)
+            if wait > 0:
+                self.rejected[(route, scope)] = self.rejected.get((route, scope), 0) + 1
+                RATE_LIMITED.inc(route, scope)
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, please slow down.",
+                    headers={"Retry-After": str(math.ceil(wait))}
+                )
+        for _, bucket, key in wanted:
+            bucket.take(key)
+
+    def stats(self) -> dict:
+        routes = {
+            route: {
+                scope: {
+                    "rate_per_second": bucket.rate,
+                    "burst": bucket.burst,
+                    "rejected": self.rejected.get((route, scope), 0),
+                }
+                for scope, bucket in buckets.items()
+            }
+            for route, buckets in self.routes.items()
+        }
+        return {"routes": routes, "state": self.state.stats()}
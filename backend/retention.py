@@ -0,0 +1,183 @@
+"""
+Retention for chat history.
+
+Hot turns live in `chat_history`, one document per turn. Sessions that have
+been idle for `idle_after` seconds are moved in bulk into `chat_archive`, one
+compact document per session whose turns are zlib-compressed JSON, together
+with the session's rolling summary. When an archived session comes back its
+turns are restored to `chat_history` before the request reads them.
+
+Hot turns carry an `expires_at` date covered by a TTL index (see
+`schema.ensure_indexes`), the backstop that bounds hot storage even if archiving
+falls behind, so the TTL must be longer than the idle window. Restored turns
+get a fresh `expires_at`, so an old session coming back is not expired by the
+TTL monitor right after the archive copy is gone.
+"""
+import asyncio
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from schema import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+def pack_turns(turns: List[dict]) -> bytes:
+    rows = [
+        [t["id"], t["role"], t["content"],
+         t["timestamp"].isoformat() if isinstance(t["timestamp"], datetime) else t["timestamp"]]
+        for t in turns
+    ]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), 6)
+
+
+def unpack_turns(session_id: str, data: bytes) -> List[dict]:
+    return [
+        {"id": id_, "session_id": session_id, "role": role, "content": content,
+         "timestamp": parse_timestamp(timestamp)}
+        for id_, role, content, timestamp in json.loads(zlib.decompress(data))
+    ]
+
+
+def with_expiry(docs: List[dict], ttl: Optional[float]) -> List[dict]:
+    """Stamp hot-history documents with the date the TTL index may delete them"""
+    if not ttl:
+        return docs
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    return [{**doc, "expires_at": expires_at} for doc in docs]
+
+
+def _archivable(cutoff: datetime) -> dict:
+    # Unmigrated string timestamps never match a date comparison, so name them explicitly
+    return {"$or": [{"timestamp": {"$lt": cutoff}}, {"timestamp": {"$type": "string"}}]}
+
+
+class ChatArchiver:
+    """Moves idle sessions to `chat_archive` and restores them on return"""
+
+    def __init__(self, idle_after: float, batch_size: int = 100, hot_ttl: Optional[float] = None):
+        self.idle_after = idle_after
+        self.hot_ttl = hot_ttl
+        self.batch_size = batch_size
+        self.archived_sessions = 0
+        self.archived_turns = 0
+        self.restored_sessions = 0
+
+    async def idle_sessions(self, db, cutoff: datetime) -> List[str]:
+        # $sort + $group/$last on (session_id, timestamp) reads one index key per session
+        pipeline = [
+            {"$sort": {"session_id": 1, "timestamp": 1}},
+            {"$group": {"_id": "$session_id", "last": {"$last": "$timestamp"}}},
+            {"$match": {"last": {"$lt": cutoff}}},
+            {"$limit": self.batch_size},
+        ]
+        return [group["_id"] async for group in db.chat_history.aggregate(pipeline)]
+
+    async def archive_batch(self, db, cutoff: datetime) -> int:
+        """Archive up to `batch_size` idle sessions; returns how many were archived"""
+        sessions = await self.idle_sessions(db, cutoff)
+        if not sessions:
+            return 0
+
+        query = {"session_id": {"$in": sessions}, **_archivable(cutoff)}
+        docs, summaries, existing = await asyncio.gather(
+            db.chat_history.find(query, {"_id": 0}).sort([("session_id", 1), ("timestamp", 1)]).to_list(None),
+            db.chat_summaries.find({"session_id": {"$in": sessions}}, {"_id": 0}).to_list(None),
+            db.chat_archive.find({"session_id": {"$in": sessions}}, {"_id": 0}).to_list(None),
+        )
+        turns: Dict[str, List[dict]] = {sid: [] for sid in sessions}
+        for doc in docs:
+            turns[doc["session_id"]].append(doc)
+        summaries = {s["session_id"]: s for s in summaries}
+        existing = {a["session_id"]: a for a in existing}
+
+        now = datetime.now(timezone.utc)
+        ops = []
+        for sid in sessions:
+            session_turns = turns[sid]
+            # A session archived before may have come back for a few turns without being restored
+            if sid in existing:
+                seen = {t["id"] for t in session_turns}
+                older = [t for t in unpack_turns(sid, existing[sid]["data"]) if t["id"] not in seen]
+                session_turns = older + session_turns
+            if not session_turns:
+                continue
+            summary = summaries.get(sid) or existing.get(sid, {}).get("summary")
+            ops.append(UpdateOne(
+                {"session_id": sid},
+                {"$set": {
+                    "session_id": sid,
+                    "turns": len(session_turns),
+                    "first_at": session_turns[0]["timestamp"],
+                    "last_at": session_turns[-1]["timestamp"],
+                    "archived_at": now,
+                    "summary": summary,
+                    "data": pack_turns(session_turns),
+                }},
+                upsert=True
+            ))
+            self.archived_turns += len(session_turns)
+
+        # Write the archive first: a crash in between leaves duplicates, never a loss
+        if ops:
+            await db.chat_archive.bulk_write(ops, ordered=False)
+        await db.chat_history.delete_many(query)
+        await db.chat_summaries.delete_many({"session_id": {"$in": sessions}})
+        self.archived_sessions += len(ops)
+        return len(sessions)
+
+    async def archive_idle(self, db) -> int:
+        """Archive every session idle for longer than `idle_after`"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.idle_after)
+        total = 0
+        while True:
+            archived = await self.archive_batch(db, cutoff)
+            total += archived
+            if archived < self.batch_size:
+                break
+        if total:
+            logger.info(f"Archived {total} idle chat sessions")
+        return total
+
+    async def run_forever(self, db, interval: float):
+        while True:
+            try:
+                await self.archive_idle(db)
+            except Exception:
+                logger.exception("Chat archiving failed")
+            await asyncio.sleep(interval)
+
+    async def restore(self, db, session_id: str) -> bool:
+        """Move an archived session back to hot storage; False when there is none"""
+        # Claiming the archive document makes concurrent restores of one session a no-op
+        archived = await db.chat_archive.find_one_and_delete({"session_id": session_id}, {"_id": 0})
+        if archived is None:
+            return False
+
+        turns = with_expiry(unpack_turns(session_id, archived["data"]), self.hot_ttl)
+        try:
+            await db.chat_history.insert_many(turns, ordered=False)
+            if archived.get("summary"):
+                await db.chat_summaries.replace_one(
+                    {"session_id": session_id}, archived["summary"], upsert=True
+                )
+        except Exception:
+            # Undo the partial restore and put the archive back for the next attempt
+            await db.chat_history.delete_many({"session_id": session_id, "id": {"$in": [t["id"] for t in turns]}})
+            await db.chat_archive.replace_one({"session_id": session_id}, archived, upsert=True)
+            raise
+        self.restored_sessions += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "idle_after": self.idle_after,
+            "archived_sessions": self.archived_sessions,
+            "archived_turns": self.archived_turns,
+            "restored_sessions": self.restored_sessions,
+        }
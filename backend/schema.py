@@ -0,0 +1,198 @@
+"""
+Startup schema bootstrap.
+
+Creates the indexes the API's queries rely on and migrates timestamps that
+older versions stored as ISO strings to native BSON dates. The migration only
+selects documents whose field is still a string and updates each one
+conditionally on its old value, so it is idempotent, safe to run from several
+replicas at once and resumes where it stopped after a restart.
+
+Bootstrap never deletes subscribers on its own: when several rows share an
+email the unique email index is skipped with a warning, until duplicates are
+removed explicitly (DEDUPE_SUBSCRIPTIONS=1 or the admin endpoint), which first
+copies every removed row into `newsletter_duplicates`.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ASCENDING, TEXT, UpdateOne
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# (collection, field) pairs stored as ISO strings before native dates
+TIMESTAMP_FIELDS = [
+    ("status_checks", "timestamp"),
+    ("newsletter_subscriptions", "subscribed_at"),
+    ("chat_history", "timestamp"),
+    ("launch_config", "updated_at"),
+]
+
+
+async def ensure_indexes(db, chat_history_ttl: Optional[int] = None, dedupe: bool = False):
+    """Create the indexes used by the API (no-op when they already exist)"""
+    await db.chat_history.create_index(
+        [("session_id", ASCENDING), ("timestamp", ASCENDING)],
+        name="session_timestamp"
+    )
+    # Expiry is per document (`expires_at`), so restoring archived turns can push it back
+    await drop_index(db, "chat_history", "timestamp_ttl")
+    if chat_history_ttl:
+        await ensure_ttl_index(db, "chat_history", "expires_at", 0)
+    else:
+        await drop_index(db, "chat_history", "expires_at_ttl")
+    # Staff search over message text (see chat_search)
+    await db.chat_history.create_index(
+        [("content", TEXT)],
+        name="content_text",
+        default_language="english"
+    )
+    await db.chat_archive.create_index(
+        [("session_id", ASCENDING)],
+        name="session_unique",
+        unique=True
+    )
+    await db.chat_summaries.create_index(
+        [("session_id", ASCENDING)],
+        name="session_unique",
+        unique=True
+    )
+    # Keyset pagination order for the admin list endpoints
+    await db.status_checks.create_index(
+        [("timestamp", ASCENDING), ("id", ASCENDING)],
+        name="timestamp_id"
+    )
+    # Covers the status rollup aggregation (range on timestamp, group on client_name)
+    await db.status_checks.create_index(
+        [("timestamp", ASCENDING), ("client_name", ASCENDING)],
+        name="timestamp_client"
+    )
+    await db.newsletter_subscriptions.create_index(
+        [("subscribed_at", ASCENDING), ("id", ASCENDING)],
+        name="subscribed_at_id"
+    )
+    # Concurrent first $inc upserts of one (bucket, source) are retried by the server on this key
+    await db.signup_rollups.create_index(
+        [("bucket", ASCENDING), ("source", ASCENDING)],
+        name="bucket_source",
+        unique=True
+    )
+    await ensure_email_index(db, dedupe)
+
+
+async def ensure_ttl_index(db, collection: str, field: str, expire_after: int):
+    """Create a TTL index, or change its expiry in place when it already exists"""
+    name = f"{field}_ttl"
+    try:
+        await db[collection].create_index([(field, ASCENDING)], name=name, expireAfterSeconds=expire_after)
+    except OperationFailure as e:
+        # IndexOptionsConflict: same key, different expireAfterSeconds
+        if e.code != 85:
+            raise
+        await db.command("collMod", collection, index={"name": name, "expireAfterSeconds": expire_after})
+
+
+async def drop_index(db, collection: str, name: str):
+    try:
+        await db[collection].drop_index(name)
+    except OperationFailure as e:
+        # IndexNotFound
+        if e.code != 27:
+            raise
+
+
+def _duplicate_groups(db):
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$email", "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]
+    return db.newsletter_subscriptions.aggregate(pipeline, allowDiskUse=True)
+
+
+async def dedupe_subscriptions(db) -> int:
+    """Move repeat signups for the same email, keeping the earliest, into `newsletter_duplicates`"""
+    moved = 0
+    removed_at = datetime.now(timezone.utc)
+    async for group in _duplicate_groups(db):
+        keep, extra = group["ids"][0], group["ids"][1:]
+        async for doc in db.newsletter_subscriptions.find({"_id": {"$in": extra}}):
+            # Upsert on the original _id so a run interrupted after the copy can simply be repeated
+            await db.newsletter_duplicates.replace_one(
+                {"_id": doc["_id"]}, {**doc, "duplicate_of": keep, "removed_at": removed_at}, upsert=True
+            )
+        result = await db.newsletter_subscriptions.delete_many({"_id": {"$in": extra}})
+        moved += result.deleted_count
+    if moved:
+        logger.warning(f"Moved {moved} duplicate newsletter subscriptions to newsletter_duplicates")
+    return moved
+
+
+async def ensure_email_index(db, dedupe: bool = False) -> dict:
+    """Build the unique email index; with duplicates present only when `dedupe` moves them aside first"""
+    duplicates = 0
+    async for group in _duplicate_groups(db):
+        duplicates += group["n"] - 1
+    if duplicates and not dedupe:
+        logger.warning(
+            f"{duplicates} newsletter subscriptions repeat an earlier email; not creating the unique "
+            f"email index (set DEDUPE_SUBSCRIPTIONS=1 or POST /api/newsletter/dedupe to move them aside)"
+        )
+        return {"duplicates": duplicates, "moved": 0, "indexed": False}
+    moved = await dedupe_subscriptions(db) if duplicates else 0
+    await db.newsletter_subscriptions.create_index(
+        [("email", ASCENDING)],
+        name="email_unique",
+        unique=True
+    )
+    return {"duplicates": duplicates, "moved": moved, "indexed": True}
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_timestamps(db, batch_size: int = 1000) -> int:
+    """Convert string timestamps to BSON dates in batches; returns documents converted"""
+    converted = 0
+    for collection_name, field in TIMESTAMP_FIELDS:
+        collection = db[collection_name]
+        while True:
+            docs = await collection.find(
+                {field: {"$type": "string"}},
+                {"_id": 1, field: 1}
+            ).to_list(batch_size)
+            if not docs:
+                break
+
+            ops = []
+            for doc in docs:
+                update = {}
+                try:
+                    update[field] = parse_timestamp(doc[field])
+                except ValueError:
+                    # Keep the original text next to a sentinel date so the batch can move on
+                    logger.error(f"Unparseable {collection_name}.{field} on {doc['_id']}: {doc[field]!r}")
+                    update[field] = datetime.fromtimestamp(0, timezone.utc)
+                    update[f"{field}_raw"] = doc[field]
+                ops.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": update}))
+
+            result = await collection.bulk_write(ops, ordered=False)
+            converted += result.modified_count
+        logger.info(f"Timestamp migration done for {collection_name}.{field}")
+    return converted
+
+
+async def bootstrap_schema(db, chat_history_ttl: Optional[int] = None, dedupe: bool = False):
+    try:
+        await ensure_indexes(db, chat_history_ttl, dedupe)
+        converted = await migrate_timestamps(db)
+    except Exception:
+        logger.exception("Schema bootstrap failed")
+        return
+    if converted:
+        logger.info(f"Migrated {converted} string timestamps to native dates")
@@ -1,29 +1,283 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+# Imported first: its clock times everything loaded before the app can serve
+from startup import StartupReport, warm_mongo
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from starlette.background import BackgroundTask
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
 from typing import List, Optional
 import uuid
+import json
+import random
+import asyncio
+import time
 from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from chat_context import (
+    SessionContext, SessionContextCache, ContextCompactor, load_context, build_prompt, estimate_tokens,
+)
+from llm_provider import get_llm_provider
+from state_backend import get_state_backend
+from faq_cache import FAQCache, normalize_question
+from write_behind import WriteBehindQueue
+from schema import bootstrap_schema, ensure_email_index
+from retention import ChatArchiver, with_expiry
+from chat_search import search_chats
+from question_clusters import QuestionClusterer
+from newsletter_import import import_subscriber_csv
+from signup_rollups import rebuild_rollups, record_signups, signup_growth
+from status_checks import BUCKETS, as_utc, bucket_range, insert_status_checks, parse_status_batch, status_rollup
+from counters import CachedCounter
+from pagination import fetch_page, export_rows
+from launch_config import LaunchConfigCache, etag_matches
+from admission import AdmissionController, AdmissionRejected
+from single_flight import SingleFlight
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from rate_limit import RateLimiter, parse_rate
+from profiling import ProfileStore, ProfilingMiddleware
+from metrics import (
+    REGISTRY, MetricsMiddleware, MongoCommandMetrics, LLM_LATENCY, LLM_TOKENS, CHAT_FALLBACKS, CHAT_ERRORS,
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection; MONGO_WARM_CONNECTIONS are opened at startup and kept in the pool
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+MONGO_WARM_CONNECTIONS = int(os.environ.get('MONGO_WARM_CONNECTIONS', '10'))
+client = AsyncIOMotorClient(
+    mongo_url,
+    tz_aware=True,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    minPoolSize=MONGO_WARM_CONNECTIONS,
+    event_listeners=[MongoCommandMetrics()],
+)
 db = client[os.environ['DB_NAME']]
 
 # LLM Key
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
 
-# Create the main app without a prefix
-app = FastAPI()
+# LLM provider (LLM_PROVIDER=fake runs fully offline)
+llm = get_llm_provider()
+
+# Caches, counters and limiters shared by every worker on the host when STATE_BACKEND=mmap.
+# Still per worker: the FAQ cache, LLM admission (so the host-wide limit is
+# LLM_MAX_CONCURRENCY x workers), single-flight dedupe and the write-behind queue.
+state = get_state_backend()
+
+# Hot chat sessions kept in-process so most turns skip the history read
+session_contexts = SessionContextCache(
+    max_sessions=int(os.environ.get('CHAT_CONTEXT_MAX_SESSIONS', '1024')),
+    idle_ttl=float(os.environ.get('CHAT_CONTEXT_IDLE_TTL', '900')),
+    state=state,
+)
+
+# Prompt budget; older turns are folded into a rolling per-session summary
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', '1500'))
+
+SUMMARY_SYSTEM_MESSAGE = """You maintain a running summary of a conversation between a website visitor and the AetherX Assistant.
+Keep the visitor's name, preferences, questions asked and answers given. Reply with the updated summary only, in under 150 words."""
+
+async def summarize_turns(summary: str, turns: List[dict]) -> str:
+    transcript = "\n".join(
+        f"{'User' if t['role'] == 'user' else 'Assistant'}: {t['content']}" for t in turns
+    )
+    prompt = f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"
+    return await complete_llm("context-compactor", SUMMARY_SYSTEM_MESSAGE, prompt)
+
+async def complete_llm(session_id: str, system_message: str, prompt: str) -> str:
+    """llm.complete under the deadline and circuit breaker, with latency and token accounting"""
+    start = time.perf_counter()
+    try:
+        async with llm_breaker.guard():
+            response = await asyncio.wait_for(llm.complete(session_id, system_message, prompt), LLM_DEADLINE)
+    except CircuitOpen:
+        raise
+    except Exception:
+        LLM_LATENCY.observe(time.perf_counter() - start, llm.name, "error")
+        raise
+    LLM_LATENCY.observe(time.perf_counter() - start, llm.name, "ok")
+    LLM_TOKENS.inc(llm.name, "prompt", amount=estimate_tokens(system_message) + estimate_tokens(prompt))
+    LLM_TOKENS.inc(llm.name, "completion", amount=estimate_tokens(response))
+    return response
+
+compactor = ContextCompactor(
+    summarize_turns,
+    keep_turns=int(os.environ.get('CHAT_CONTEXT_KEEP_TURNS', '6')),
+    pending=lambda session_id: chat_writer.pending(session_id),
+)
+
+# Chat history is written in batches off the request path
+chat_writer = WriteBehindQueue(
+    lambda docs: db.chat_history.insert_many(with_expiry(docs, CHAT_HISTORY_TTL), ordered=False),
+    max_batch=int(os.environ.get('CHAT_WRITE_BATCH_SIZE', '500')),
+    flush_interval=float(os.environ.get('CHAT_WRITE_FLUSH_INTERVAL', '0.05')),
+    max_buffer=int(os.environ.get('CHAT_WRITE_BUFFER', '10000')),
+)
+
+# Hot history expires CHAT_HISTORY_TTL_DAYS after it is written (or restored); idle
+# sessions are archived well before that
+CHAT_HISTORY_TTL = int(float(os.environ.get('CHAT_HISTORY_TTL_DAYS', '90')) * 86400)
+
+# Off by default: startup only reports duplicate signups instead of removing them
+DEDUPE_SUBSCRIPTIONS = os.environ.get('DEDUPE_SUBSCRIPTIONS', '0') == '1'
+chat_archiver = ChatArchiver(
+    idle_after=float(os.environ.get('CHAT_ARCHIVE_IDLE_DAYS', '14')) * 86400,
+    batch_size=int(os.environ.get('CHAT_ARCHIVE_BATCH', '100')),
+    hot_ttl=CHAT_HISTORY_TTL,
+)
+CHAT_ARCHIVE_INTERVAL = float(os.environ.get('CHAT_ARCHIVE_INTERVAL', '3600'))
+
+# Waitlist size served from a maintained counter document
+subscriber_count = CachedCounter(
+    "newsletter_subscriptions",
+    ttl=float(os.environ.get('COUNT_CACHE_TTL', '2')),
+    state=state,
+)
+COUNT_RECONCILE_INTERVAL = float(os.environ.get('COUNT_RECONCILE_INTERVAL', '300'))
+
+# Days of subscribers aggregated per step when the signup rollups are rebuilt
+SIGNUP_ROLLUP_CHUNK_DAYS = int(os.environ.get('SIGNUP_ROLLUP_CHUNK_DAYS', '7'))
+
+# Launch config rendered once per write (or TTL) and revalidated by ETag
+launch_config = LaunchConfigCache(ttl=float(os.environ.get('LAUNCH_CONFIG_TTL', '30')), state=state)
+LAUNCH_CONFIG_MAX_AGE = int(os.environ.get('LAUNCH_CONFIG_MAX_AGE', '60'))
+
+# Bounded concurrency for upstream LLM calls (per worker)
+llm_admission = AdmissionController(
+    max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', '32')),
+    max_queue=int(os.environ.get('LLM_MAX_QUEUE', '64')),
+    queue_timeout=float(os.environ.get('LLM_QUEUE_TIMEOUT', '2')),
+)
+
+# Upstream calls give up after LLM_DEADLINE seconds; while the error/slow-call ratio is
+# too high the breaker answers from the FAQ cache or a canned reply without calling out
+LLM_DEADLINE = float(os.environ.get('LLM_DEADLINE', '8'))
+llm_breaker = CircuitBreaker(
+    window=int(os.environ.get('LLM_BREAKER_WINDOW', '20')),
+    min_calls=int(os.environ.get('LLM_BREAKER_MIN_CALLS', '10')),
+    failure_ratio=float(os.environ.get('LLM_BREAKER_FAILURE_RATIO', '0.5')),
+    slow_call=float(os.environ.get('LLM_BREAKER_SLOW_CALL', '4')),
+    open_for=float(os.environ.get('LLM_BREAKER_OPEN_FOR', '30')),
+    probes=int(os.environ.get('LLM_BREAKER_PROBES', '1')),
+)
+
+# Per-client request budgets, checked before any I/O ("count/seconds", "0" disables)
+rate_limits = RateLimiter(
+    {
+        "chat": {
+            "ip": parse_rate(os.environ.get('RATE_LIMIT_CHAT_IP', '30/60')),
+            "session": parse_rate(os.environ.get('RATE_LIMIT_CHAT_SESSION', '10/60')),
+        },
+        # Shared by every client: caps overall LLM spend. Taken right before an upstream
+        # call, so FAQ-cache hits, single-flight followers and canned replies are free
+        "llm": {
+            "global": parse_rate(os.environ.get('RATE_LIMIT_LLM_GLOBAL', '50/1')),
+        },
+        "subscribe": {
+            "ip": parse_rate(os.environ.get('RATE_LIMIT_SUBSCRIBE_IP', '5/60')),
+        },
+    },
+    state=state,
+    forwarded_hops=int(os.environ.get('RATE_LIMIT_FORWARDED_HOPS', '0')),
+)
+
+# Identical first-turn questions in flight share one upstream call
+llm_flights = SingleFlight()
+
+# Answers to context-free launch questions, matched on near-duplicates
+faq_cache = FAQCache(
+    max_entries=int(os.environ.get('FAQ_CACHE_MAX_ENTRIES', '512')),
+    ttl=float(os.environ.get('FAQ_CACHE_TTL', '3600')),
+    threshold=float(os.environ.get('FAQ_CACHE_THRESHOLD', '0.9')),
+)
+
+# Batch clustering of visitor questions, started from the admin endpoint
+question_clusters = QuestionClusterer(
+    k=int(os.environ.get('QUESTION_CLUSTER_K', '30')),
+    n_features=int(os.environ.get('QUESTION_CLUSTER_FEATURES', '65536')),
+    chunk_size=int(os.environ.get('QUESTION_CLUSTER_CHUNK_SIZE', '2000')),
+    top=int(os.environ.get('QUESTION_CLUSTER_TOP', '20')),
+)
+
+# On-demand request profiles (X-Profile: <PROFILE_TOKEN> or PROFILE_SAMPLE_RATE); off unless configured
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+profiles = ProfileStore(capacity=int(os.environ.get('PROFILE_BUFFER', '20')))
+
+CHAT_SYSTEM_MESSAGE = """You are AetherX Assistant, an AI helper for the AetherX product launch website. 
+AetherX is a revolutionary AI-powered creative platform that combines neural architecture with quantum-inspired algorithms.
+
+Key facts about AetherX:
+- Tagline: "Where Intelligence Meets Imagination"
+- Features: Neural Architecture, Quantum Core, Creative Engine, Instant Response, Universal Language support (100+ languages), Secure by Design
+- 3+ years of R&D, 50M+ parameters
+- Currently in pre-launch phase with a waitlist
+
+Be helpful, enthusiastic, and encourage users to join the waitlist for early access. Keep responses concise and engaging.
+If asked about pricing, features, or launch date, mention that details will be shared with waitlist members first."""
+
+FALLBACK_RESPONSES = [
+    "Thanks for your interest in AetherX! We're launching soon. Join our waitlist to get early access and be the first to experience the future of AI-powered creativity.",
+    "AetherX combines neural architecture with quantum-inspired algorithms for unprecedented creative capabilities. Sign up for our waitlist to stay updated!",
+    "Great question! Our team is working hard on AetherX. Join the waitlist below to get exclusive early access and updates.",
+]
+
+# Import and warm-up costs, served by GET /api/startup; GET /api/ready waits for warm-up,
+# which is retried every STARTUP_WARMUP_RETRY seconds until Mongo answers
+startup_report = StartupReport()
+STARTUP_WARMUP_TIMEOUT = float(os.environ.get('STARTUP_WARMUP_TIMEOUT', '30'))
+STARTUP_WARMUP_RETRY = float(os.environ.get('STARTUP_WARMUP_RETRY', '5'))
+
+async def warm_up():
+    """Open pooled Mongo connections and load the LLM client before taking traffic"""
+    while True:
+        startup_report.attempts += 1
+        try:
+            mongo_ok, _ = await asyncio.wait_for(asyncio.gather(
+                startup_report.timed("mongo_pool", warm_mongo(db, MONGO_WARM_CONNECTIONS)),
+                startup_report.timed("llm_client", llm.warm()),
+            ), STARTUP_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            startup_report.errors["warmup"] = f"gave up after {STARTUP_WARMUP_TIMEOUT}s"
+            mongo_ok = False
+        # Without Mongo the replica cannot serve; a cold LLM client only costs the first call
+        if mongo_ok:
+            startup_report.errors.pop("warmup", None)
+            startup_report.finish()
+            return
+        logging.warning(f"Warm-up attempt {startup_report.attempts} failed, retrying in {STARTUP_WARMUP_RETRY}s")
+        await asyncio.sleep(STARTUP_WARMUP_RETRY)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Indexes and the timestamp migration run in the background so startup is not blocked
+    if os.environ.get('SCHEMA_BOOTSTRAP', '1') == '1':
+        app.state.schema_task = asyncio.create_task(bootstrap_schema(db, CHAT_HISTORY_TTL, DEDUPE_SUBSCRIPTIONS))
+    chat_writer.start()
+    reconcile_task = asyncio.create_task(subscriber_count.reconcile_forever(db, COUNT_RECONCILE_INTERVAL))
+    archive_task = asyncio.create_task(chat_archiver.run_forever(db, CHAT_ARCHIVE_INTERVAL))
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+    reconcile_task.cancel()
+    archive_task.cancel()
+    await chat_writer.drain()
+    client.close()
+
+# Batch status ingestion and rollup limits
+STATUS_BATCH_MAX = int(os.environ.get('STATUS_BATCH_MAX', '10000'))
+STATUS_ROLLUP_MAX_BUCKETS = int(os.environ.get('STATUS_ROLLUP_MAX_BUCKETS', '2000'))
+
+# Create the main app without a prefix (orjson encodes datetimes and UUIDs natively)
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -37,6 +291,11 @@ class StatusCheck(BaseModel):
     client_name: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class StatusCheckReport(BaseModel):
+    """One check in a batch; probes may send when it ran"""
+    client_name: str
+    timestamp: Optional[datetime] = None
+
 class StatusCheckCreate(BaseModel):
     client_name: str
 
@@ -84,6 +343,15 @@ class LaunchConfig(BaseModel):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+def export_response(cursor, fmt: str, fields: List[str], filename: str) -> StreamingResponse:
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(cursor, fmt, fields),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+
 # Routes
 @api_router.get("/")
 async def root():
@@ -95,33 +363,70 @@ async def create_status_check(input: StatusCheckCreate):
     status_obj = StatusCheck(**status_dict)
     
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     
     _ = await db.status_checks.insert_one(doc)
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+@api_router.post("/status/batch")
+async def create_status_checks(request: Request):
+    """Record many status checks from a JSON list or an NDJSON body"""
+    try:
+        items = parse_status_batch(await request.body(), request.headers.get("content-type", ""))
+        if len(items) > STATUS_BATCH_MAX:
+            raise HTTPException(status_code=413, detail=f"At most {STATUS_BATCH_MAX} checks per batch")
+        reports = [StatusCheckReport(**item) for item in items]
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
-    return status_checks
+    now = datetime.now(timezone.utc)
+    docs = [
+        StatusCheck(client_name=r.client_name, timestamp=as_utc(r.timestamp) if r.timestamp else now).model_dump()
+        for r in reports
+    ]
+    inserted = await insert_status_checks(db.status_checks, docs)
+    return {"inserted": inserted}
+
+@api_router.get("/status/rollup")
+async def get_status_rollup(
+    bucket: str = Query("hour", pattern="^(minute|hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    client_name: Optional[List[str]] = Query(None)
+):
+    """Per-client check counts and last-seen times per minute, hour or day"""
+    end = as_utc(end) if end else datetime.now(timezone.utc)
+    start, end = bucket_range(bucket, as_utc(start) if start else None, end)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start).total_seconds() / BUCKETS[bucket] > STATUS_ROLLUP_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans more than {STATUS_ROLLUP_MAX_BUCKETS} {bucket} buckets; use a coarser bucket"
+        )
+    clients = await status_rollup(db.status_checks, bucket, start, end, client_name)
+    return {"bucket": bucket, "start": start, "end": end, "clients": clients}
+
+@api_router.get("/status", response_model=List[StatusCheck])
+async def get_status_checks(
+    limit: int = Query(1000, ge=1, le=5000),
+    cursor: Optional[str] = None
+):
+    status_checks, next_cursor = await fetch_page(db.status_checks, "timestamp", limit, cursor)
+    # The next page's cursor travels in a header so the body stays a plain list
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    # Our own documents: encode them directly instead of re-validating into StatusCheck models
+    return ORJSONResponse(status_checks, headers=headers)
+
+@api_router.get("/status/export")
+async def export_status_checks(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Stream all status checks as NDJSON or CSV"""
+    cursor = db.status_checks.find({}, {"_id": 0}).sort([("timestamp", 1), ("id", 1)])
+    return export_response(cursor, format, ["id", "client_name", "timestamp"], "status_checks")
 
 # Newsletter Endpoints
 @api_router.post("/newsletter/subscribe", response_model=NewsletterResponse)
-async def subscribe_newsletter(input: NewsletterSubscribe):
-    # Check if email already exists
-    existing = await db.newsletter_subscriptions.find_one({"email": input.email}, {"_id": 0})
-    
-    if existing:
-        return NewsletterResponse(
-            success=False,
-            message="This email is already on the waitlist!",
-            id=existing.get('id')
-        )
+async def subscribe_newsletter(input: NewsletterSubscribe, request: Request):
+    rate_limits.check("subscribe", request)
     
     subscription = NewsletterSubscription(
         email=input.email,
@@ -129,9 +434,28 @@ async def subscribe_newsletter(input: NewsletterSubscribe):
     )
     
     doc = subscription.model_dump()
-    doc['subscribed_at'] = doc['subscribed_at'].isoformat()
     
-    await db.newsletter_subscriptions.insert_one(doc)
+    # Single atomic upsert; the unique email index settles concurrent signups
+    try:
+        existing = await db.newsletter_subscriptions.find_one_and_update(
+            {"email": doc['email']},
+            {"$setOnInsert": doc},
+            projection={"_id": 0, "id": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        existing = await db.newsletter_subscriptions.find_one({"email": doc['email']}, {"_id": 0, "id": 1})
+    
+    if existing:
+        return NewsletterResponse(
+            success=False,
+            message="This email is already on the waitlist!",
+            id=existing.get('id')
+        )
+    
+    await subscriber_count.increment(db, 1)
+    await record_signups(db, [doc])
     
     return NewsletterResponse(
         success=True,
@@ -139,143 +463,456 @@ async def subscribe_newsletter(input: NewsletterSubscribe):
         id=subscription.id
     )
 
+@api_router.post("/newsletter/import")
+async def import_subscribers(request: Request, source: str = "import"):
+    """Bulk import subscribers from a streamed CSV body (admin endpoint)"""
+    stats = await import_subscriber_csv(
+        db.newsletter_subscriptions, request.stream(), source=source,
+        on_insert=lambda docs: record_signups(db, docs)
+    )
+    await subscriber_count.increment(db, stats['inserted'])
+    return {"success": True, **stats}
+
+@api_router.post("/newsletter/dedupe")
+async def dedupe_newsletter_subscriptions():
+    """Move duplicate subscriptions to newsletter_duplicates and build the unique email index (admin endpoint)"""
+    result = await ensure_email_index(db, dedupe=True)
+    await subscriber_count.reconcile(db)
+    return result
+
 @api_router.get("/newsletter/count")
 async def get_subscription_count():
-    count = await db.newsletter_subscriptions.count_documents({})
+    count = await subscriber_count.get(db)
     return {"count": count}
 
+@api_router.get("/newsletter/growth")
+async def get_signup_growth(
+    bucket: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    source: Optional[str] = None
+):
+    """Signups per hour or day and per source, served from the rollups (admin endpoint)"""
+    return await signup_growth(
+        db, bucket, as_utc(start) if start else None, as_utc(end) if end else None, source
+    )
+
+@api_router.post("/newsletter/growth/rebuild")
+async def rebuild_signup_growth():
+    """Recompute the signup rollups from the subscribers, in chunks (admin endpoint)"""
+    return await rebuild_rollups(db, chunk_days=SIGNUP_ROLLUP_CHUNK_DAYS)
+
 @api_router.get("/newsletter/subscribers")
-async def get_subscribers():
+async def get_subscribers(limit: int = Query(1000, ge=1, le=5000), cursor: Optional[str] = None):
     """Get list of subscribers (admin endpoint)"""
-    subscribers = await db.newsletter_subscriptions.find({}, {"_id": 0}).to_list(1000)
-    for sub in subscribers:
-        if isinstance(sub.get('subscribed_at'), str):
-            sub['subscribed_at'] = datetime.fromisoformat(sub['subscribed_at'])
-    return {"subscribers": subscribers, "total": len(subscribers)}
+    subscribers, next_cursor = await fetch_page(
+        db.newsletter_subscriptions, "subscribed_at", limit, cursor
+    )
+    return ORJSONResponse({"subscribers": subscribers, "total": len(subscribers), "next_cursor": next_cursor})
+
+@api_router.get("/newsletter/subscribers/export")
+async def export_subscribers(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Stream all subscribers as NDJSON or CSV (admin endpoint)"""
+    cursor = db.newsletter_subscriptions.find({}, {"_id": 0}).sort([("subscribed_at", 1), ("id", 1)])
+    return export_response(
+        cursor, format, ["id", "email", "name", "subscribed_at", "source"], "subscribers"
+    )
 
 # Chatbot Endpoints
+async def load_session(session_id: str):
+    """Session context, restoring the session from the archive if it went cold"""
+    context = await load_context(db, session_contexts, session_id)
+    if context.empty and await chat_archiver.restore(db, session_id):
+        session_contexts.invalidate(session_id)
+        context = await load_context(db, session_contexts, session_id)
+    return context
+
+async def save_chat_turn(session_id: str, message: str, response: str):
+    """Persist a completed user/assistant exchange and update the session cache"""
+    # Store user message
+    user_history = ChatHistory(
+        session_id=session_id,
+        role="user",
+        content=message
+    )
+    user_doc = user_history.model_dump()
+    await chat_writer.put(user_doc)
+    
+    # Store assistant response
+    assistant_history = ChatHistory(
+        session_id=session_id,
+        role="assistant",
+        content=response
+    )
+    assistant_doc = assistant_history.model_dump()
+    await chat_writer.put(assistant_doc)
+    
+    session_contexts.append(session_id, "user", message, user_doc['timestamp'])
+    session_contexts.append(session_id, "assistant", response, assistant_doc['timestamp'])
+    
+    # Fold older turns into the rolling summary once the session outgrows its budget
+    context = session_contexts.get(session_id)
+    if context is not None and compactor.needs_compaction(context, "", CHAT_CONTEXT_TOKEN_BUDGET):
+        compactor.schedule(db, session_contexts, session_id)
+
+async def ask_llm(session_id: str, context: SessionContext, message: str) -> str:
+    rate_limits.check("llm")
+    async with llm_admission.admit(session_id):
+        # One LLM call per turn: prior context is folded into the prompt
+        prompt = build_prompt(context, message, CHAT_CONTEXT_TOKEN_BUDGET)
+        return await complete_llm(session_id, CHAT_SYSTEM_MESSAGE, prompt)
+
+async def ask_llm_and_cache(session_id: str, message: str) -> str:
+    """Context-free turn shared by every caller asking it: answer once and keep it in the FAQ cache"""
+    # Each caller holds its own session claim, so the shared call only takes an LLM slot
+    # and one token of the global budget
+    rate_limits.check("llm")
+    async with llm_admission.admit(None):
+        prompt = build_prompt(SessionContext([]), message, CHAT_CONTEXT_TOKEN_BUDGET)
+        response = await complete_llm(session_id, CHAT_SYSTEM_MESSAGE, prompt)
+    faq_cache.put(message, response)
+    return response
+
+def overload_answer(e: AdmissionRejected, message: str) -> str:
+    """Cached answer for a turn rejected by admission control, else the 429/503 itself"""
+    cached = faq_cache.get(message)
+    if cached is None:
+        CHAT_ERRORS.inc(f"rejected_{e.status_code}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    CHAT_FALLBACKS.inc("overload_cached")
+    return cached
+
+def degraded_answer(message: str, reason: str) -> str:
+    """Cached answer, else a canned reply, for a turn the LLM cannot serve right now"""
+    cached = faq_cache.get(message)
+    if cached is not None:
+        CHAT_FALLBACKS.inc(f"{reason}_cached")
+        return cached
+    CHAT_FALLBACKS.inc(reason)
+    return random.choice(FALLBACK_RESPONSES)
+
 @api_router.post("/chat", response_model=ChatResponse)
-async def chat_with_bot(input: ChatMessage):
+async def chat_with_bot(input: ChatMessage, request: Request):
     """AI-powered chatbot endpoint"""
+    rate_limits.check("chat", request, input.session_id)
+    
     try:
-        # Get chat history for context
-        history = await db.chat_history.find(
-            {"session_id": input.session_id},
-            {"_id": 0}
-        ).sort("timestamp", 1).to_list(20)
-        
-        # Build system message
-        system_message = """You are AetherX Assistant, an AI helper for the AetherX product launch website. 
-AetherX is a revolutionary AI-powered creative platform that combines neural architecture with quantum-inspired algorithms.
-
-Key facts about AetherX:
-- Tagline: "Where Intelligence Meets Imagination"
-- Features: Neural Architecture, Quantum Core, Creative Engine, Instant Response, Universal Language support (100+ languages), Secure by Design
-- 3+ years of R&D, 50M+ parameters
-- Currently in pre-launch phase with a waitlist
-
-Be helpful, enthusiastic, and encourage users to join the waitlist for early access. Keep responses concise and engaging.
-If asked about pricing, features, or launch date, mention that details will be shared with waitlist members first."""
-
-        # Initialize chat
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=input.session_id,
-            system_message=system_message
-        ).with_model("openai", "gpt-4o-mini")
-        
-        # Add history context to the chat
-        for msg in history[-10:]:  # Last 10 messages for context
-            if msg['role'] == 'user':
-                await chat.send_message(UserMessage(text=msg['content']))
-            # Assistant messages are handled by the chat library
-        
-        # Send new message
-        user_message = UserMessage(text=input.message)
-        response = await chat.send_message(user_message)
+        # Recent turns for context (served from the session cache when hot)
+        context = await load_session(input.session_id)
         
-        # Store user message
-        user_history = ChatHistory(
-            session_id=input.session_id,
-            role="user",
-            content=input.message
-        )
-        user_doc = user_history.model_dump()
-        user_doc['timestamp'] = user_doc['timestamp'].isoformat()
-        await db.chat_history.insert_one(user_doc)
+        # Context-free questions are served from the FAQ cache when possible
+        response = faq_cache.get(input.message) if context.empty else None
+        if response is None:
+            try:
+                # Fail fast while the breaker is open instead of queueing for a slot
+                llm_breaker.check()
+                if not context.empty:
+                    response = await ask_llm(input.session_id, context, input.message)
+                else:
+                    with llm_admission.session_turn(input.session_id):
+                        response = await llm_flights.do(
+                            normalize_question(input.message),
+                            lambda: ask_llm_and_cache(input.session_id, input.message)
+                        )
+            except AdmissionRejected as e:
+                response = overload_answer(e, input.message)
+            except CircuitOpen:
+                response = degraded_answer(input.message, "circuit_open")
+            except asyncio.TimeoutError:
+                logging.warning(f"LLM call for {input.session_id} missed its {LLM_DEADLINE}s deadline")
+                response = degraded_answer(input.message, "deadline")
         
-        # Store assistant response
-        assistant_history = ChatHistory(
-            session_id=input.session_id,
-            role="assistant",
-            content=response
-        )
-        assistant_doc = assistant_history.model_dump()
-        assistant_doc['timestamp'] = assistant_doc['timestamp'].isoformat()
-        await db.chat_history.insert_one(assistant_doc)
+        await save_chat_turn(input.session_id, input.message, response)
         
         return ChatResponse(
             response=response,
             session_id=input.session_id
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Chat error: {str(e)}")
+        CHAT_ERRORS.inc("exception")
+        CHAT_FALLBACKS.inc("error")
         # Fallback response
-        fallback_responses = [
-            "Thanks for your interest in AetherX! We're launching soon. Join our waitlist to get early access and be the first to experience the future of AI-powered creativity.",
-            "AetherX combines neural architecture with quantum-inspired algorithms for unprecedented creative capabilities. Sign up for our waitlist to stay updated!",
-            "Great question! Our team is working hard on AetherX. Join the waitlist below to get exclusive early access and updates.",
-        ]
-        import random
         return ChatResponse(
-            response=random.choice(fallback_responses),
+            response=random.choice(FALLBACK_RESPONSES),
             session_id=input.session_id
         )
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@api_router.post("/chat/stream")
+async def chat_with_bot_stream(input: ChatMessage, request: Request):
+    """Streaming chatbot endpoint (Server-Sent Events)"""
+    rate_limits.check("chat", request, input.session_id)
+    context = await load_session(input.session_id)
+    prompt = build_prompt(context, input.message, CHAT_CONTEXT_TOKEN_BUDGET)
+    cached = faq_cache.get(input.message) if context.empty else None
+    release = None
+    if cached is None:
+        try:
+            llm_breaker.check()
+            rate_limits.check("llm")
+            release = await llm_admission.acquire(input.session_id)
+        except CircuitOpen:
+            cached = degraded_answer(input.message, "circuit_open")
+        except AdmissionRejected as e:
+            cached = overload_answer(e, input.message)
+    
+    async def release_slot():
+        if release:
+            release()
+    
+    async def events():
+        if cached is not None:
+            await save_chat_turn(input.session_id, input.message, cached)
+            yield sse_event("token", {"token": cached})
+            yield sse_event("done", {"response": cached, "session_id": input.session_id})
+            return
+        
+        parts = []
+        failed = fallback = False
+        probe = first_token_at = None
+        start = time.perf_counter()
+        tokens = llm.stream(input.session_id, CHAT_SYSTEM_MESSAGE, prompt)
+        try:
+            probe = llm_breaker.begin()
+            while True:
+                # The deadline bounds the wait for the first token and every stall after it
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), LLM_DEADLINE)
+                except StopAsyncIteration:
+                    break
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                if await request.is_disconnected():
+                    # Client went away: drop the turn without persisting a partial answer
+                    return
+                parts.append(token)
+                yield sse_event("token", {"token": token})
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                logging.warning(f"LLM stream for {input.session_id} stalled past its {LLM_DEADLINE}s deadline")
+            else:
+                logging.error(f"Chat stream error: {str(e)}")
+            CHAT_ERRORS.inc("stream_exception")
+            failed = True
+            if not parts:
+                reason = "deadline" if isinstance(e, asyncio.TimeoutError) else \
+                    "circuit_open" if isinstance(e, CircuitOpen) else "error"
+                CHAT_FALLBACKS.inc(reason)
+                fallback = True
+                parts = [random.choice(FALLBACK_RESPONSES)]
+                yield sse_event("token", {"token": parts[0]})
+        finally:
+            # Closes the upstream call on disconnect or cancellation
+            await tokens.aclose()
+            await release_slot()
+            if probe is not None:
+                # Streams are judged on time to first token, not on the length of the reply
+                llm_breaker.end(probe, not failed, (first_token_at or time.perf_counter()) - start)
+            LLM_LATENCY.observe(time.perf_counter() - start, llm.name, "error" if failed else "ok")
+        
+        response = "".join(parts)
+        if failed and not fallback:
+            # Cut off mid-reply: tell the client instead of passing the fragment off as an answer
+            yield sse_event("error", {
+                "error": "The reply was interrupted, please try again.",
+                "partial": response,
+                "session_id": input.session_id,
+            })
+            return
+        if not failed:
+            LLM_TOKENS.inc(llm.name, "prompt", amount=estimate_tokens(CHAT_SYSTEM_MESSAGE) + estimate_tokens(prompt))
+            LLM_TOKENS.inc(llm.name, "completion", amount=estimate_tokens(response))
+        if context.empty and not failed:
+            faq_cache.put(input.message, response)
+        await save_chat_turn(input.session_id, input.message, response)
+        yield sse_event("done", {"response": response, "session_id": input.session_id})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Safety net in case the stream is torn down before it starts
+        background=BackgroundTask(release_slot)
+    )
+
 @api_router.get("/chat/history/{session_id}")
 async def get_chat_history(session_id: str):
     """Get chat history for a session"""
     history = await db.chat_history.find(
         {"session_id": session_id},
-        {"_id": 0}
+        {"_id": 0, "expires_at": 0}
     ).sort("timestamp", 1).to_list(100)
+    if not history and await chat_archiver.restore(db, session_id):
+        session_contexts.invalidate(session_id)
+        history = await db.chat_history.find(
+            {"session_id": session_id},
+            {"_id": 0, "expires_at": 0}
+        ).sort("timestamp", 1).to_list(100)
     
-    return {"history": history, "session_id": session_id}
+    # Include this session's writes that are still queued
+    pending = chat_writer.pending(session_id)
+    if pending:
+        seen = {msg['id'] for msg in history}
+        # Queued documents are always newer than persisted ones
+        history.extend(doc for doc in pending if doc['id'] not in seen)
+        history = history[:100]
+    
+    return ORJSONResponse({"history": history, "session_id": session_id})
+
+@api_router.get("/chat/search")
+async def search_chat_history(
+    q: str = Query(..., min_length=1, max_length=200),
+    role: Optional[str] = Query(None, pattern="^(user|assistant)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Sessions whose messages match a text query, with highlighted snippets (admin endpoint)"""
+    return await search_chats(
+        db.chat_history, q, role=role,
+        start=as_utc(start) if start else None, end=as_utc(end) if end else None,
+        limit=limit, cursor=cursor
+    )
 
 @api_router.delete("/chat/history/{session_id}")
 async def clear_chat_history(session_id: str):
     """Clear chat history for a session"""
+    # Queued writes must land first or they would reappear after the delete
+    await chat_writer.flush()
     result = await db.chat_history.delete_many({"session_id": session_id})
+    await db.chat_summaries.delete_one({"session_id": session_id})
+    await db.chat_archive.delete_one({"session_id": session_id})
+    session_contexts.invalidate(session_id)
     return {"deleted": result.deleted_count, "session_id": session_id}
 
+@api_router.get("/chat/cache")
+async def get_chat_cache_stats():
+    """FAQ cache size and hit rate (admin endpoint)"""
+    return faq_cache.stats()
+
+@api_router.get("/chat/admission")
+async def get_chat_admission_stats():
+    """LLM concurrency, queue depth and wait times (admin endpoint)"""
+    return {**llm_admission.stats(), "single_flight": llm_flights.stats()}
+
+@api_router.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until startup warm-up has reached Mongo"""
+    if not startup_report.ready:
+        return ORJSONResponse({"ready": False, "errors": startup_report.errors}, status_code=503)
+    return {"ready": True}
+
+@api_router.get("/startup")
+async def get_startup_report():
+    """Import and warm-up time per startup phase (admin endpoint)"""
+    return startup_report.as_dict()
+
+@api_router.get("/chat/clusters")
+async def get_question_clusters():
+    """Largest clusters of visitor questions from the last clustering run (admin endpoint)"""
+    return {"running": question_clusters.running, "result": await question_clusters.latest(db)}
+
+@api_router.post("/chat/clusters", status_code=202)
+async def start_question_clustering():
+    """Re-cluster all visitor questions in the background (admin endpoint)"""
+    if not question_clusters.start(db):
+        raise HTTPException(status_code=409, detail="Clustering is already running")
+    return {"started": True}
+
+@api_router.get("/chat/breaker")
+async def get_chat_breaker_stats():
+    """LLM circuit breaker state and recent failure ratio (admin endpoint)"""
+    return {**llm_breaker.stats(), "deadline": LLM_DEADLINE}
+
+@api_router.get("/rate-limits")
+async def get_rate_limit_stats():
+    """Bucket sizes, evictions and rejections per route (admin endpoint)"""
+    return rate_limits.stats()
+
+@api_router.delete("/chat/cache")
+async def invalidate_chat_cache():
+    """Drop all cached FAQ answers (admin endpoint)"""
+    return {"invalidated": faq_cache.invalidate()}
+
+@api_router.get("/chat/archive")
+async def get_chat_archive_stats():
+    """Archived and restored session counts (admin endpoint)"""
+    return chat_archiver.stats()
+
+@api_router.post("/chat/archive")
+async def archive_idle_chats():
+    """Archive idle sessions now instead of waiting for the next pass (admin endpoint)"""
+    return {"archived": await chat_archiver.archive_idle(db)}
+
 # Launch Configuration
 @api_router.get("/launch/config")
-async def get_launch_config():
+async def get_launch_config(request: Request):
     """Get launch configuration"""
-    config = await db.launch_config.find_one({}, {"_id": 0})
-    if not config:
-        # Default: 30 days from now
-        default_date = datetime.now(timezone.utc) + timedelta(days=30)
-        return {"launch_date": default_date.isoformat()}
-    return config
+    body, etag = await launch_config.get(db)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={LAUNCH_CONFIG_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @api_router.post("/launch/config")
 async def set_launch_config(launch_date: str):
     """Set launch date (admin endpoint)"""
     config = LaunchConfig(launch_date=launch_date)
     doc = config.model_dump()
-    doc['updated_at'] = doc['updated_at'].isoformat()
     
-    await db.launch_config.delete_many({})
-    await db.launch_config.insert_one(doc)
+    await launch_config.set(db, doc)
     
     return {"success": True, "launch_date": launch_date}
 
+# Profiling
+@api_router.get("/admin/profiles")
+async def list_profiles():
+    """Recently captured request profiles, newest first (admin endpoint)"""
+    return profiles.list()
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str):
+    """Download a profile as folded stacks for flamegraph.pl or speedscope (admin endpoint)"""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=profile.folded(),
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
+
 
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+if PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profiles,
+        token=PROFILE_TOKEN,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        interval=float(os.environ.get('PROFILE_INTERVAL', '0.005')),
+    )
+
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -291,9 +928,4 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Import timedelta for launch config
-from datetime import timedelta
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+startup_report.mark("imports")
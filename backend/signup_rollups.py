@@ -0,0 +1,122 @@
+"""
+Waitlist growth rollups.
+
+`signup_rollups` holds one `{bucket, source, count}` document per hour and
+signup source, bumped with `$inc` whenever subscribers are inserted, so the
+growth endpoint reads at most one document per hour and source in the range
+however many subscribers there are.
+
+`rebuild_rollups` recomputes them from `newsletter_subscriptions` one chunk of
+days at a time with a server-side aggregation. It only rewrites hours before
+the current one: new signups land in the current hour, so finished hours are
+no longer incremented and can be overwritten without racing live `$inc`s.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteOne, UpdateOne
+
+from schema import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE = "waitlist"
+
+
+def hour_bucket(value) -> datetime:
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+async def record_signups(db, docs: Iterable[dict]):
+    """Count newly inserted subscriber documents into their (hour, source) rollups"""
+    counts = Counter((hour_bucket(d["subscribed_at"]), d.get("source") or DEFAULT_SOURCE) for d in docs)
+    if not counts:
+        return
+    await db.signup_rollups.bulk_write([
+        UpdateOne({"bucket": bucket, "source": source}, {"$inc": {"count": n}}, upsert=True)
+        for (bucket, source), n in counts.items()
+    ], ordered=False)
+
+
+async def _aggregate_chunk(db, start: datetime, end: datetime) -> Dict[Tuple[datetime, str], int]:
+    pipeline = [
+        {"$match": {"subscribed_at": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "bucket": {"$subtract": ["$subscribed_at", {"$mod": [{"$toLong": "$subscribed_at"}, 3600 * 1000]}]},
+                "source": {"$ifNull": ["$source", DEFAULT_SOURCE]},
+            },
+            "count": {"$sum": 1},
+        }},
+    ]
+    return {
+        (group["_id"]["bucket"], group["_id"]["source"]): group["count"]
+        async for group in db.newsletter_subscriptions.aggregate(pipeline, allowDiskUse=True)
+    }
+
+
+async def rebuild_rollups(db, chunk_days: int = 7) -> dict:
+    """Recompute every finished hour's rollups from the subscribers, `chunk_days` at a time"""
+    first = await db.newsletter_subscriptions.find(
+        {"subscribed_at": {"$type": "date"}}, {"_id": 0, "subscribed_at": 1}
+    ).sort("subscribed_at", 1).limit(1).to_list(1)
+    stats = {"chunks": 0, "buckets": 0, "removed": 0}
+    if not first:
+        return stats
+
+    until = hour_bucket(datetime.now(timezone.utc))
+    start = hour_bucket(first[0]["subscribed_at"])
+    while start < until:
+        end = min(start + timedelta(days=chunk_days), until)
+        counts = await _aggregate_chunk(db, start, end)
+        existing = await db.signup_rollups.find(
+            {"bucket": {"$gte": start, "$lt": end}}, {"_id": 0, "bucket": 1, "source": 1}
+        ).to_list(None)
+        ops: List = [
+            UpdateOne({"bucket": bucket, "source": source}, {"$set": {"count": n}}, upsert=True)
+            for (bucket, source), n in counts.items()
+        ]
+        stale = [
+            DeleteOne({"bucket": r["bucket"], "source": r["source"]})
+            for r in existing if (r["bucket"], r["source"]) not in counts
+        ]
+        if ops or stale:
+            await db.signup_rollups.bulk_write(ops + stale, ordered=False)
+        stats["chunks"] += 1
+        stats["buckets"] += len(counts)
+        stats["removed"] += len(stale)
+        start = end
+    logger.info(f"Rebuilt signup rollups: {stats}")
+    return stats
+
+
+async def signup_growth(db, bucket: str = "hour", start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, source: Optional[str] = None) -> dict:
+    """Signups per hour or day (and per source) over [start, end), read from the rollups"""
+    query: dict = {}
+    if start or end:
+        query["bucket"] = {**({"$gte": hour_bucket(start)} if start else {}), **({"$lt": end} if end else {})}
+    if source:
+        query["source"] = source
+    rollups = await db.signup_rollups.find(query, {"_id": 0}).sort("bucket", 1).to_list(None)
+
+    series: Dict[datetime, Dict[str, int]] = {}
+    sources: Counter = Counter()
+    for r in rollups:
+        key = r["bucket"] if bucket == "hour" else r["bucket"].replace(hour=0)
+        per_source = series.setdefault(key, {})
+        per_source[r["source"]] = per_source.get(r["source"], 0) + r["count"]
+        sources[r["source"]] += r["count"]
+    return {
+        "bucket": bucket,
+        "total": sum(sources.values()),
+        "sources": dict(sources),
+        "series": [
+            {"start": key, "count": sum(per_source.values()), "sources": per_source}
+            for key, per_source in series.items()
+        ],
+    }
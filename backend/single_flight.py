@@ -0,0 +1,40 @@
+"""
+Single-flight deduplication of identical in-flight calls.
+
+The first caller for a key runs the call; callers that arrive with the same
+key while it is still running await the same result (or exception) instead of
+starting their own.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            self.leaders += 1
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        else:
+            self.followers += 1
+        # Shielded so one cancelled caller does not cancel the call for everyone else
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        # Mark the exception retrieved even if every caller was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "followers": self.followers}
@@ -0,0 +1,68 @@
+"""
+Startup timing and connection warm-up.
+
+Importing this module starts the clock, so `server` imports it first and the
+report's "imports" phase covers everything the process loads before serving.
+Warm-up (Mongo pool, LLM client) runs in the background after the app starts
+accepting connections; `StartupReport.ready` flips once Mongo has answered, and
+the readiness probe keeps the replica out of rotation until then. A replica
+that cannot reach Mongo keeps retrying and stays unready.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+STARTED = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Seconds spent per startup phase, and whether warm-up has finished"""
+
+    def __init__(self, started: float = STARTED):
+        self.started = started
+        self.phases: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ready = False
+        self.ready_after: Optional[float] = None
+        self.attempts = 0
+
+    def mark(self, phase: str):
+        """Record `phase` as ending now, having started with the process"""
+        self.phases[phase] = time.perf_counter() - self.started
+
+    async def timed(self, phase: str, step) -> bool:
+        """Await `step`, recording its duration and any error instead of raising; False if it failed"""
+        start = time.perf_counter()
+        try:
+            await step
+        except Exception as e:
+            logger.warning(f"Startup phase {phase} failed: {str(e)}")
+            self.errors[phase] = str(e) or type(e).__name__
+            return False
+        finally:
+            self.phases[phase] = time.perf_counter() - start
+        self.errors.pop(phase, None)
+        return True
+
+    def finish(self):
+        self.ready = True
+        self.ready_after = time.perf_counter() - self.started
+        logger.info(f"Ready {self.ready_after:.2f}s after start: " +
+                    ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items()))
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "ready_after": self.ready_after,
+            "attempts": self.attempts,
+            "phases": self.phases,
+            "errors": self.errors,
+        }
+
+
+async def warm_mongo(db, connections: int):
+    """Open `connections` pool connections by running that many pings at once (always at least one)"""
+    await asyncio.gather(*(db.command("ping") for _ in range(max(connections, 1))))
@@ -0,0 +1,320 @@
+"""
+Pluggable state backend for caches, counters and limiters.
+
+`LocalState` keeps everything in the worker process. `MmapState` keeps it in a
+memory-mapped file (by default on /dev/shm), so every `uvicorn --workers N`
+process on a host sees the same counters and table without a network service.
+
+Both offer atomic named counters and a bounded key/value table of small byte
+values with optional expiry and an atomic read-modify-write (`update`). The
+mmap table is set-associative: a key can only live in the `ways` slots of its
+set, and a full set evicts its least recently used slot, which makes it an
+approximate LRU in constant space. Cross-process atomicity comes from POSIX
+byte-range locks on just the set (or counter slot) being touched.
+
+    STATE_BACKEND=mmap STATE_PATH=/dev/shm/aetherx-state uvicorn server:app --workers 4
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+Updater = Callable[[Optional[bytes]], bytes]
+
+
+class StateBackend(ABC):
+    """Interface shared by the in-process and cross-worker implementations"""
+
+    @abstractmethod
+    def incr(self, name: str, by: int = 1) -> int:
+        """Atomically add `by` to a named counter and return the new value"""
+
+    @abstractmethod
+    def counter(self, name: str) -> int:
+        """Current value of a named counter (0 if never incremented)"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Value stored under `key`, or None when missing, expired or evicted"""
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self.update(key, lambda _: value, ttl)
+
+    @abstractmethod
+    def update(self, key: str, fn: Updater, ttl: Optional[float] = None) -> bytes:
+        """Atomically replace the value with `fn(current or None)` and return it"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Drop `key` from the table"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Table size, capacity and evictions"""
+
+
+class LocalState(StateBackend):
+    """Per-process state: a dict of counters and an LRU table of `max_keys` entries"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._counters: Dict[str, int] = {}
+        # key -> (value, expires or None)
+        self._table: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def incr(self, name: str, by: int = 1) -> int:
+        with self._lock:
+            value = self._counters[name] = self._counters.get(name, 0) + by
+            return value
+
+    def counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._table.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and time.time() >= expires:
+            del self._table[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._live(key)
+            if value is not None:
+                self._table.move_to_end(key)
+            return value
+
+    def update(self, key: str, fn: Updater, ttl: Optional[float] = None) -> bytes:
+        with self._lock:
+            value = fn(self._live(key))
+            if key in self._table:
+                self._table.move_to_end(key)
+            elif len(self._table) >= self.max_keys:
+                self._table.popitem(last=False)
+                self.evicted += 1
+            self._table[key] = (value, time.time() + ttl if ttl else None)
+            return value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._table.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"backend": "local", "entries": len(self._table), "capacity": self.max_keys,
+                "evicted": self.evicted, "counters": len(self._counters)}
+
+
+# File layout: header | counter slots | table slots
+_MAGIC = b"AXST0001"
+_HEADER = struct.Struct("<8sIIIIQ")      # magic, counter slots, table sets, ways, value size, evicted
+_HEADER_SIZE = 64
+_COUNTER = struct.Struct("<Qq")          # key hash (0 = free), value
+_SLOT = struct.Struct("<QddI4x")         # key hash (0 = free), expires (0 = never), last used, length
+
+
+def _hash(key: str) -> int:
+    # 64-bit keyed digest; 0 marks a free slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class MmapState(StateBackend):
+    """State shared by every process that maps the same file"""
+
+    def __init__(self, path: str, table_slots: int = 65536, ways: int = 8, value_size: int = 64,
+                 counter_slots: int = 256):
+        self.path = path
+        self.ways = ways
+        self.sets = max(1, table_slots // ways)
+        self.value_size = value_size
+        self.counter_slots = counter_slots
+        self.slot_size = _SLOT.size + value_size
+        self._counters_at = _HEADER_SIZE
+        self._table_at = self._counters_at + counter_slots * _COUNTER.size
+        self.size = self._table_at + self.sets * ways * self.slot_size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        # POSIX record locks do not exclude threads of one process
+        self._thread_lock = threading.Lock()
+        try:
+            with self._locked(0, _HEADER_SIZE):
+                self._init_file()
+        except Exception:
+            os.close(self._fd)
+            raise
+        self._map = mmap.mmap(self._fd, self.size, mmap.MAP_SHARED)
+
+    def _init_file(self):
+        header = os.pread(self._fd, _HEADER.size, 0)
+        expected = (_MAGIC, self.counter_slots, self.sets, self.ways, self.value_size)
+        if not header.strip(b"\0"):
+            os.ftruncate(self._fd, self.size)
+            os.pwrite(self._fd, _HEADER.pack(*expected, 0), 0)
+            return
+        found = _HEADER.unpack(header)[:5] if len(header) == _HEADER.size else None
+        if found != expected:
+            # Other workers may still have the old layout mapped; resizing it under them would SIGBUS
+            raise RuntimeError(
+                f"State file {self.path} was created with different settings {found} (expected {expected}); "
+                f"point STATE_PATH at a new file or remove it once no worker is using it"
+            )
+
+    def _locked(self, start: int, length: int):
+        return _RangeLock(self._fd, self._thread_lock, start, length)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    # Counters: open addressing over a small fixed region
+    def _counter_offset(self, name: str, create: bool) -> Optional[int]:
+        h = _hash(name)
+        for i in range(self.counter_slots):
+            offset = self._counters_at + ((h + i) % self.counter_slots) * _COUNTER.size
+            slot_hash, _ = _COUNTER.unpack_from(self._map, offset)
+            if slot_hash == h:
+                return offset
+            if slot_hash == 0:
+                if not create:
+                    return None
+                _COUNTER.pack_into(self._map, offset, h, 0)
+                return offset
+        raise RuntimeError("Shared counter region is full")
+
+    def incr(self, name: str, by: int = 1) -> int:
+        with self._locked(self._counters_at, self.counter_slots * _COUNTER.size):
+            offset = self._counter_offset(name, create=True)
+            h, value = _COUNTER.unpack_from(self._map, offset)
+            _COUNTER.pack_into(self._map, offset, h, value + by)
+            return value + by
+
+    def counter(self, name: str) -> int:
+        with self._locked(self._counters_at, self.counter_slots * _COUNTER.size):
+            offset = self._counter_offset(name, create=False)
+            return 0 if offset is None else _COUNTER.unpack_from(self._map, offset)[1]
+
+    # Table: set-associative slots, each set guarded by its own byte-range lock
+    def _set_range(self, h: int) -> Tuple[int, int]:
+        start = self._table_at + (h % self.sets) * self.ways * self.slot_size
+        return start, self.ways * self.slot_size
+
+    def _find(self, h: int, start: int, now: float) -> Tuple[Optional[int], Optional[bytes]]:
+        for way in range(self.ways):
+            offset = start + way * self.slot_size
+            slot_hash, expires, _, length = _SLOT.unpack_from(self._map, offset)
+            if slot_hash == h:
+                if expires and now >= expires:
+                    return offset, None
+                value_at = offset + _SLOT.size
+                return offset, bytes(self._map[value_at:value_at + length])
+        return None, None
+
+    def _victim(self, start: int, now: float) -> Tuple[int, bool]:
+        """Free or expired slot if there is one, else the least recently used (evicted)"""
+        oldest, oldest_used = start, float("inf")
+        for way in range(self.ways):
+            offset = start + way * self.slot_size
+            slot_hash, expires, last_used, _ = _SLOT.unpack_from(self._map, offset)
+            if slot_hash == 0 or (expires and now >= expires):
+                return offset, False
+            if last_used < oldest_used:
+                oldest, oldest_used = offset, last_used
+        return oldest, True
+
+    def get(self, key: str) -> Optional[bytes]:
+        h = _hash(key)
+        start, length = self._set_range(h)
+        now = time.time()
+        with self._locked(start, length):
+            offset, value = self._find(h, start, now)
+            if value is not None:
+                slot_hash, expires, _, size = _SLOT.unpack_from(self._map, offset)
+                _SLOT.pack_into(self._map, offset, slot_hash, expires, now, size)
+            return value
+
+    def update(self, key: str, fn: Updater, ttl: Optional[float] = None) -> bytes:
+        h = _hash(key)
+        start, length = self._set_range(h)
+        now = time.time()
+        with self._locked(start, length):
+            offset, current = self._find(h, start, now)
+            value = fn(current)
+            if len(value) > self.value_size:
+                raise ValueError(f"Value of {len(value)} bytes exceeds the {self.value_size}-byte slot")
+            if offset is None:
+                offset, evicted = self._victim(start, now)
+                if evicted:
+                    self._count_eviction()
+            _SLOT.pack_into(self._map, offset, h, now + ttl if ttl else 0.0, now, len(value))
+            self._map[offset + _SLOT.size:offset + _SLOT.size + len(value)] = value
+            return value
+
+    def delete(self, key: str):
+        h = _hash(key)
+        start, length = self._set_range(h)
+        with self._locked(start, length):
+            offset, _ = self._find(h, start, time.time())
+            if offset is not None:
+                _SLOT.pack_into(self._map, offset, 0, 0.0, 0.0, 0)
+
+    def _count_eviction(self):
+        # Called with the thread lock already held, so only the header's file lock is taken
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _HEADER_SIZE, 0)
+        try:
+            header = list(_HEADER.unpack_from(self._map, 0))
+            header[-1] += 1
+            _HEADER.pack_into(self._map, 0, *header)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _HEADER_SIZE, 0)
+
+    def stats(self) -> dict:
+        now = time.time()
+        entries = 0
+        for i in range(self.sets * self.ways):
+            slot_hash, expires, _, _ = _SLOT.unpack_from(self._map, self._table_at + i * self.slot_size)
+            if slot_hash and not (expires and now >= expires):
+                entries += 1
+        return {"backend": "mmap", "path": self.path, "entries": entries,
+                "capacity": self.sets * self.ways, "evicted": _HEADER.unpack_from(self._map, 0)[-1]}
+
+
+class _RangeLock:
+    def __init__(self, fd: int, thread_lock: threading.Lock, start: int, length: int):
+        self.fd = fd
+        self.thread_lock = thread_lock
+        self.start = start
+        self.length = length
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, self.length, self.start)
+
+    def __exit__(self, *exc):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN, self.length, self.start)
+        self.thread_lock.release()
+
+
+def get_state_backend() -> StateBackend:
+    """Backend selected by STATE_BACKEND (local | mmap)"""
+    kind = os.environ.get('STATE_BACKEND', 'local')
+    if kind == 'mmap':
+        return MmapState(
+            os.environ.get('STATE_PATH', '/dev/shm/aetherx-state'),
+            table_slots=int(os.environ.get('STATE_TABLE_SLOTS', '65536')),
+            value_size=int(os.environ.get('STATE_VALUE_SIZE', '64')),
+        )
+    if kind == 'local':
+        # RATE_LIMIT_MAX_KEYS is the older name, from when only the rate limiter had a table
+        max_keys = os.environ.get('STATE_MAX_KEYS', os.environ.get('RATE_LIMIT_MAX_KEYS', '10000'))
+        return LocalState(max_keys=int(max_keys))
+    raise ValueError(f"Unknown STATE_BACKEND {kind!r}")
@@ -0,0 +1,97 @@
+"""
+Batch ingestion and time-bucketed rollups for status checks.
+
+Probes post many checks per request, as a JSON list or NDJSON (one object per
+line), and they are written with chunked `insert_many` calls. Rollups group
+checks per `client_name` and minute/hour/day bucket in one aggregation over
+the `timestamp_client` index, which covers both fields the pipeline reads.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+import orjson
+
+BUCKETS = {"minute": 60, "hour": 3600, "day": 86400}
+# Window used when the caller gives no `start`, in buckets
+DEFAULT_SPAN = {"minute": 60, "hour": 24, "day": 30}
+
+
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def parse_status_batch(body: bytes, content_type: str = "") -> List[dict]:
+    """Objects in a JSON list or NDJSON body; raises ValueError naming the bad line"""
+    if "ndjson" not in content_type and body.lstrip().startswith(b"["):
+        items = orjson.loads(body)
+        if not all(isinstance(item, dict) for item in items):
+            raise ValueError("Expected a list of objects")
+        return items
+    items = []
+    for number, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            item = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Line {number}: {e}") from None
+        if not isinstance(item, dict):
+            raise ValueError(f"Line {number}: expected an object")
+        items.append(item)
+    return items
+
+
+async def insert_status_checks(collection, docs: List[dict], batch_size: int = 1000) -> int:
+    inserted = 0
+    for i in range(0, len(docs), batch_size):
+        result = await collection.insert_many(docs[i:i + batch_size], ordered=False)
+        inserted += len(result.inserted_ids)
+    return inserted
+
+
+def bucket_range(bucket: str, start: Optional[datetime], end: datetime):
+    """`start` defaulted and aligned down to a whole bucket (UTC)"""
+    seconds = BUCKETS[bucket]
+    if start is None:
+        start = end - timedelta(seconds=seconds * DEFAULT_SPAN[bucket])
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    start -= timedelta(seconds=(start - epoch).total_seconds() % seconds)
+    return start, end
+
+
+def rollup_pipeline(bucket: str, start: datetime, end: datetime,
+                    client_names: Optional[Iterable[str]] = None) -> List[dict]:
+    match = {"timestamp": {"$gte": start, "$lt": end}}
+    if client_names:
+        match["client_name"] = {"$in": list(client_names)}
+    ms = BUCKETS[bucket] * 1000
+    return [
+        {"$match": match},
+        # Date arithmetic rather than $dateTrunc, which needs MongoDB 5.0
+        {"$group": {
+            "_id": {
+                "client_name": "$client_name",
+                "bucket": {"$subtract": ["$timestamp", {"$mod": [{"$toLong": "$timestamp"}, ms]}]},
+            },
+            "count": {"$sum": 1},
+            "last_seen": {"$max": "$timestamp"},
+        }},
+        {"$sort": {"_id.bucket": 1}},
+        {"$group": {
+            "_id": "$_id.client_name",
+            "count": {"$sum": "$count"},
+            "last_seen": {"$max": "$last_seen"},
+            "buckets": {"$push": {"start": "$_id.bucket", "count": "$count", "last_seen": "$last_seen"}},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+async def status_rollup(collection, bucket: str, start: datetime, end: datetime,
+                        client_names: Optional[Iterable[str]] = None) -> List[dict]:
+    """Per-client totals with one entry per non-empty bucket, oldest first"""
+    return [
+        {"client_name": group["_id"], "count": group["count"], "last_seen": group["last_seen"],
+         "buckets": group["buckets"]}
+        async for group in collection.aggregate(rollup_pipeline(bucket, start, end, client_names))
+    ]
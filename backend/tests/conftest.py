@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+# Backend modules are imported flat (as uvicorn does from backend/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# server.py reads these at import time: no real Mongo connection or pool warm-up, fake LLM, no index bootstrap
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["SCHEMA_BOOTSTRAP"] = "0"
+os.environ["MONGO_WARM_CONNECTIONS"] = "0"
@@ -0,0 +1,54 @@
+"""
+Unit tests for LLM admission control
+"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_concurrency_limit_and_queue_deadline():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        release = await controller.acquire("a")
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire("b")
+        assert exc.value.status_code == 503
+        release()
+        release()  # idempotent
+        async with controller.admit("b"):
+            assert controller.stats()["active"] == 1
+        return controller.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0
+    assert stats["admitted"] == 2 and stats["rejected"] == 1
+
+
+def test_full_queue_fails_fast():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=1)
+        release = await controller.acquire("a")
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 1
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire("c")
+        assert exc.value.status_code == 503
+        release()
+        (await waiter)()
+
+    asyncio.run(run())
+
+
+def test_one_turn_per_session():
+    async def run():
+        controller = AdmissionController()
+        async with controller.admit("a"):
+            with pytest.raises(AdmissionRejected) as exc:
+                await controller.acquire("a")
+            assert exc.value.status_code == 429
+        (await controller.acquire("a"))()
+
+    asyncio.run(run())
@@ -0,0 +1,163 @@
+"""
+Unit tests for the chatbot session context layer (no Mongo or LLM required)
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from chat_context import (
+    ContextCompactor, SessionContext, SessionContextCache, build_prompt, estimate_tokens, fit_turns,
+    load_context,
+)
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def turn(role, content, minute):
+    return {"role": role, "content": content, "timestamp": T0 + timedelta(minutes=minute)}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+        self.finds = 0
+
+    def _match(self, doc, query):
+        for key, cond in query.items():
+            if isinstance(cond, dict):
+                if not doc.get(key) > cond["$gt"]:
+                    return False
+            elif doc.get(key) != cond:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return FakeCursor([dict(d) for d in self.docs if self._match(d, query)])
+
+    async def find_one(self, query, projection=None):
+        matches = [d for d in self.docs if self._match(d, query)]
+        return dict(matches[0]) if matches else None
+
+    async def update_one(self, query, update, upsert=False):
+        for doc in self.docs:
+            if self._match(doc, query):
+                doc.update(update["$set"])
+                return
+        self.docs.append({**{k: v for k, v in query.items()}, **update["$set"]})
+
+
+class FakeDB:
+    def __init__(self, history=()):
+        self.chat_history = FakeCollection(history)
+        self.chat_summaries = FakeCollection()
+
+
+class TestSessionContextCache:
+    def test_lru_bound(self):
+        cache = SessionContextCache(max_sessions=2)
+        cache.put("a", SessionContext([]))
+        cache.put("b", SessionContext([]))
+        cache.get("a")
+        cache.put("c", SessionContext([]))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert len(cache) == 2
+
+    def test_idle_eviction(self):
+        cache = SessionContextCache(idle_ttl=0.01)
+        cache.put("a", SessionContext([]))
+        time.sleep(0.02)
+        assert cache.get("a") is None
+
+    def test_append_keeps_last_turns(self):
+        cache = SessionContextCache(max_turns=3)
+        cache.put("a", SessionContext([]))
+        for i in range(5):
+            cache.append("a", "user", str(i), T0 + timedelta(minutes=i))
+        assert [t["content"] for t in cache.get("a").turns] == ["2", "3", "4"]
+
+
+def test_load_context_reads_once_then_hits_cache():
+    db = FakeDB([
+        {"session_id": "s", **turn("user", "hi", 0)},
+        {"session_id": "s", **turn("assistant", "hello", 1)},
+    ])
+    cache = SessionContextCache()
+    context = asyncio.run(load_context(db, cache, "s"))
+    assert [t["role"] for t in context.turns] == ["user", "assistant"]
+    asyncio.run(load_context(db, cache, "s"))
+    assert db.chat_history.finds == 1
+
+
+def test_build_prompt_includes_both_roles():
+    context = SessionContext([turn("user", "My name is Ada", 0), turn("assistant", "Hi Ada", 1)])
+    prompt = build_prompt(context, "What is my name?")
+    assert "User: My name is Ada" in prompt
+    assert "Assistant: Hi Ada" in prompt
+    assert prompt.endswith("What is my name?")
+    assert build_prompt(SessionContext([]), "hello") == "hello"
+
+
+def test_prompt_stays_under_budget():
+    turns = [turn("user" if i % 2 == 0 else "assistant", "x" * 400, i) for i in range(10)]
+    context = SessionContext(turns, summary="Visitor asked about pricing.", summary_through=T0 - timedelta(minutes=1))
+    prompt = build_prompt(context, "and the launch date?", budget=400)
+    assert estimate_tokens(prompt) <= 450
+    assert prompt.startswith("Summary of the earlier conversation:")
+    assert len(fit_turns(context, "and the launch date?", 400)) == 3
+
+
+def test_compaction_keeps_turns_still_queued_for_writing():
+    history = [{"session_id": "s", "id": f"m{i}", **turn("user", f"m{i}", i)} for i in range(6)]
+    queued = [{"session_id": "s", "id": f"m{i}", **turn("assistant", f"m{i}", i)} for i in range(6, 10)]
+    db = FakeDB(history)
+    folded = []
+
+    async def summarize(summary, turns):
+        folded.extend(t["content"] for t in turns)
+        return " ".join(folded)
+
+    # m5 is both stored and still reported as pending: counted once
+    compactor = ContextCompactor(summarize, keep_turns=4, pending=lambda sid: history[5:] + queued)
+    asyncio.run(compactor.compact(db, SessionContextCache(), "s"))
+    assert folded == ["m0", "m1", "m2", "m3", "m4", "m5"]
+
+
+def test_compaction_folds_older_turns_incrementally():
+    history = [{"session_id": "s", **turn("user" if i % 2 == 0 else "assistant", f"m{i}", i)} for i in range(10)]
+    db = FakeDB(history)
+    folded = []
+
+    async def summarize(summary, turns):
+        folded.append([t["content"] for t in turns])
+        return (summary + " " + " ".join(t["content"] for t in turns)).strip()
+
+    compactor = ContextCompactor(summarize, keep_turns=4)
+    cache = SessionContextCache()
+
+    async def run():
+        context = await load_context(db, cache, "s")
+        assert compactor.needs_compaction(context, "", 1500)
+        await compactor.compact(db, cache, "s")
+        db.chat_history.docs.append({"session_id": "s", **turn("user", "m10", 10)})
+        db.chat_history.docs.append({"session_id": "s", **turn("assistant", "m11", 11)})
+        await compactor.compact(db, cache, "s")
+        return context
+
+    context = asyncio.run(run())
+    assert folded == [["m0", "m1", "m2", "m3", "m4", "m5"], ["m6", "m7"]]
+    assert context.summary == "m0 m1 m2 m3 m4 m5 m6 m7"
+    assert [t["content"] for t in context.unsummarized()] == ["m8", "m9"]
@@ -0,0 +1,80 @@
+"""
+Tests for chat history search
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+import server
+from chat_search import highlight, search_chats, search_filter, search_pipeline, search_terms
+from memory_mongo import MemoryDatabase
+
+# Recent enough that the archiver started with the app leaves these sessions hot
+T0 = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+
+
+def turn(session_id, minute, role, content):
+    return {"id": f"{session_id}-{minute}", "session_id": session_id, "role": role,
+            "content": content, "timestamp": T0 + timedelta(minutes=minute)}
+
+
+def test_search_terms_keep_phrases_and_drop_negations():
+    assert search_terms('pricing "launch date" -spam') == ["launch date", "pricing"]
+
+
+def test_highlight_marks_stemmed_hits_inside_snippet():
+    content = "x" * 300 + " What are the prices? Pricing matters. " + "y" * 300
+    result = highlight(content, ["pricing"], width=80)
+    assert result["snippet"].startswith("…") and result["snippet"].endswith("…")
+    marked = [result["snippet"][s:e] for s, e in result["highlights"]]
+    assert marked == ["prices", "Pricing"]
+
+
+def test_search_groups_by_session_and_paginates(monkeypatch):
+    db = MemoryDatabase()
+    db.chat_history.docs = [
+        turn("a", 1, "user", "What is the pricing?"),
+        turn("a", 2, "assistant", "Pricing goes to the waitlist first."),
+        turn("b", 5, "user", "Is it cheaper than CompetitorX? What about price?"),
+        turn("c", 9, "user", "Hello there"),
+        turn("d", 7, "user", "Any price for teams?"),
+    ]
+    monkeypatch.setattr(server, "db", db)
+
+    with TestClient(server.app) as client:
+        first = client.get("/api/chat/search", params={"q": "pricing", "limit": 2}).json()
+        second = client.get("/api/chat/search", params={"q": "pricing", "limit": 2,
+                                                         "cursor": first["next_cursor"]}).json()
+        assistant_only = client.get("/api/chat/search", params={"q": "pricing", "role": "assistant"}).json()
+        ranged = client.get("/api/chat/search", params={
+            "q": "pricing", "start": (T0 + timedelta(minutes=6)).isoformat()
+        }).json()
+
+    # Newest matching session first; "c" never matches
+    assert [r["session_id"] for r in first["results"]] == ["d", "b"]
+    assert [r["session_id"] for r in second["results"]] == ["a"]
+    assert second["next_cursor"] is None
+    assert first["results"][0]["messages"][0]["highlights"] == [[4, 9]]
+
+    session_a = second["results"][0]
+    assert session_a["matches"] == 2
+    assert [m["role"] for m in session_a["messages"]] == ["assistant", "user"]
+    assert [r["session_id"] for r in assistant_only["results"]] == ["a"]
+    assert [r["session_id"] for r in ranged["results"]] == ["d"]
+
+
+def test_page_reads_message_bodies_only_for_its_sessions():
+    db = MemoryDatabase()
+    db.chat_history.docs = [turn("a", m, "user", f"pricing question {m}") for m in range(5)] + [
+        turn("b", 10, "user", "pricing again")
+    ]
+    match = search_filter("pricing", None, None, None)
+    # The grouping stage carries counts only
+    group = search_pipeline(match, None, 1)[1]["$group"]
+    assert set(group) == {"_id", "last_match", "matches"}
+
+    page = asyncio.run(search_chats(db.chat_history, "pricing", limit=2, per_session=2))
+    session_a = page["results"][1]
+    assert session_a["matches"] == 5
+    assert [m["id"] for m in session_a["messages"]] == ["a-4", "a-3"]
@@ -0,0 +1,114 @@
+"""
+Offline tests for POST /api/chat/stream using the fake LLM provider
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from llm_provider import FakeLLMProvider
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeChatHistory:
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if d["session_id"] == query["session_id"]])
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(dict(d) for d in docs)
+
+
+class FakeChatSummaries:
+    async def find_one(self, query, projection=None):
+        return None
+
+
+class FakeChatArchive:
+    async def find_one_and_delete(self, query, projection=None):
+        return None
+
+
+class FakeDB:
+    def __init__(self):
+        self.chat_history = FakeChatHistory()
+        self.chat_summaries = FakeChatSummaries()
+        self.chat_archive = FakeChatArchive()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "db", FakeDB())
+    monkeypatch.setattr(server, "llm", FakeLLMProvider(latency=0.01, tokens_per_second=1000))
+    server.session_contexts.invalidate("TEST_stream")
+    server.faq_cache.invalidate()
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def test_fake_provider_first_token_before_completion():
+    provider = FakeLLMProvider(latency=0.02, tokens_per_second=100)
+
+    async def run():
+        start = time.perf_counter()
+        first = None
+        async for _ in provider.stream("s", "system", "hi"):
+            if first is None:
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start
+
+    ttfb, total = asyncio.run(run())
+    assert ttfb < total / 2
+
+
+def test_stream_emits_tokens_and_persists_once(client):
+    with client.stream("POST", "/api/chat/stream", json={"session_id": "TEST_stream", "message": "hello"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    assert body.count("event: token") > 1
+    assert "event: done" in body
+    history = client.get("/api/chat/history/TEST_stream").json()["history"]
+    assert [d["role"] for d in history] == ["user", "assistant"]
+    client.portal.call(server.chat_writer.flush)
+    docs = server.db.chat_history.docs
+    assert [d["role"] for d in docs] == ["user", "assistant"]
+    assert docs[1]["content"] == server.llm.reply
+
+
+class FailingMidStream(FakeLLMProvider):
+    async def stream(self, session_id, system_message, prompt):
+        yield "Aether"
+        yield "X is"
+        raise ConnectionError("upstream reset")
+
+
+def test_stream_cut_off_mid_reply_reports_error_and_persists_nothing(client, monkeypatch):
+    monkeypatch.setattr(server, "llm", FailingMidStream())
+    with client.stream("POST", "/api/chat/stream", json={"session_id": "TEST_stream", "message": "hello"}) as response:
+        body = "".join(response.iter_text())
+
+    assert "event: error" in body and "event: done" not in body
+    assert '"partial": "AetherX is"' in body
+    client.portal.call(server.chat_writer.flush)
+    assert server.db.chat_history.docs == []
+    assert server.faq_cache.get("hello") is None
@@ -0,0 +1,107 @@
+"""
+Unit tests for the LLM circuit breaker and the chat deadline fallback
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from llm_provider import FakeLLMProvider
+from memory_mongo import MemoryDatabase
+from rate_limit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        breaker.end(breaker.begin(), False, 0.1)
+
+
+def test_opens_on_error_ratio_and_refuses_calls():
+    clock = Clock()
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_ratio=0.5, open_for=30, clock=clock)
+    breaker.end(breaker.begin(), True, 0.1)
+    fail(breaker, 2)
+    assert breaker.state == "closed"  # 2 of 3 failed, but fewer than min_calls
+    fail(breaker, 1)
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpen) as exc:
+        breaker.check()
+    assert exc.value.retry_after == pytest.approx(30)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(window=4, min_calls=4, failure_ratio=0.5, slow_call=1.0, clock=Clock())
+    for _ in range(4):
+        breaker.end(breaker.begin(), True, 2.0)
+    assert breaker.state == "open"
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = Clock()
+    breaker = CircuitBreaker(window=4, min_calls=2, failure_ratio=0.5, open_for=10, probes=1, clock=clock)
+    fail(breaker, 2)
+    clock.now = 10
+
+    probe = breaker.begin()
+    assert probe and breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.begin()  # only one probe at a time
+    breaker.end(probe, False, 0.1)
+    assert breaker.state == "open"
+
+    clock.now = 20
+    breaker.end(breaker.begin(), True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_calls"] == 0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+    monkeypatch.setattr(server, "rate_limits", RateLimiter({}))
+    monkeypatch.setattr(server, "llm_breaker", CircuitBreaker(window=4, min_calls=2, open_for=60))
+    server.faq_cache.invalidate()
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def test_deadline_turns_slow_llm_into_fallback(client, monkeypatch):
+    monkeypatch.setattr(server, "llm", FakeLLMProvider(latency=5))
+    monkeypatch.setattr(server, "LLM_DEADLINE", 0.05)
+
+    for i in range(2):
+        response = client.post("/api/chat", json={"session_id": f"TEST_deadline_{i}", "message": "Hello?"})
+        assert response.status_code == 200
+        assert response.json()["response"] in server.FALLBACK_RESPONSES
+    assert client.get("/api/chat/breaker").json()["state"] == "open"
+
+
+def test_open_circuit_answers_without_calling_llm(client, monkeypatch):
+    llm = FakeLLMProvider(latency=0)
+    monkeypatch.setattr(server, "llm", llm)
+    server.faq_cache.put("When do you launch?", "Soon, join the waitlist.")
+    fail(server.llm_breaker, 2)
+
+    response = client.post("/api/chat", json={"session_id": "TEST_open", "message": "When do you launch?"})
+    assert response.json()["response"] == "Soon, join the waitlist."
+
+    async def no_call(*args):
+        raise AssertionError("LLM called while the circuit is open")
+
+    monkeypatch.setattr(llm, "complete", no_call)
+    monkeypatch.setattr(llm, "stream", no_call)
+    response = client.post("/api/chat", json={"session_id": "TEST_open", "message": "Tell me more"})
+    assert response.json()["response"] in server.FALLBACK_RESPONSES
+    stream = client.post("/api/chat/stream", json={"session_id": "TEST_open_s", "message": "And pricing?"})
+    assert "event: done" in stream.text
+    assert server.llm_breaker.stats()["rejected"] >= 2
@@ -0,0 +1,71 @@
+"""
+Unit tests for the maintained subscriber counter
+"""
+import asyncio
+
+from counters import CachedCounter
+
+
+class FakeCounters:
+    def __init__(self):
+        self.docs = {}
+        self.finds = 0
+
+    async def find_one(self, query):
+        self.finds += 1
+        await asyncio.sleep(0.01)
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "value": 0})
+        if "$inc" in update:
+            doc["value"] += update["$inc"]["value"]
+        else:
+            doc["value"] = update["$set"]["value"]
+
+
+class FakeSource:
+    def __init__(self, n):
+        self.n = n
+
+    async def count_documents(self, query):
+        return self.n
+
+
+class FakeDB(dict):
+    def __init__(self, n):
+        super().__init__(newsletter_subscriptions=FakeSource(n))
+        self.counters = FakeCounters()
+
+
+def test_thundering_herd_triggers_one_read():
+    db = FakeDB(5)
+    db.counters.docs["newsletter_subscriptions"] = {"value": 5}
+    counter = CachedCounter("newsletter_subscriptions", ttl=60)
+
+    async def run():
+        return await asyncio.gather(*(counter.get(db) for _ in range(100)))
+
+    assert asyncio.run(run()) == [5] * 100
+    assert db.counters.finds == 1
+
+
+def test_missing_counter_is_seeded_and_incremented():
+    db = FakeDB(3)
+    counter = CachedCounter("newsletter_subscriptions", ttl=60)
+
+    async def run():
+        assert await counter.get(db) == 3
+        await counter.increment(db, 2)
+        return await counter.get(db)
+
+    assert asyncio.run(run()) == 5
+    assert db.counters.docs["newsletter_subscriptions"]["value"] == 5
+
+
+def test_reconcile_fixes_drift():
+    db = FakeDB(10)
+    db.counters.docs["newsletter_subscriptions"] = {"value": 7}
+    counter = CachedCounter("newsletter_subscriptions", ttl=60)
+    assert asyncio.run(counter.reconcile(db)) == 10
+    assert db.counters.docs["newsletter_subscriptions"]["value"] == 10
@@ -0,0 +1,52 @@
+"""
+Unit tests for the chatbot FAQ response cache
+"""
+import time
+
+from faq_cache import FAQCache, normalize_question
+
+
+def test_normalize_question():
+    assert normalize_question("  What's   AetherX?? ") == "what is aetherx"
+
+
+def test_exact_and_near_duplicate_hits():
+    cache = FAQCache()
+    cache.put("What is AetherX?", "A creative AI platform")
+    assert cache.get("what is aetherx") == "A creative AI platform"
+    assert cache.get("What's AetherX, and who is it for?") == "A creative AI platform"
+    assert cache.get("How much does it cost?") is None
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert abs(stats["hit_rate"] - 2 / 3) < 1e-9
+
+
+def test_paraphrase_hits_but_different_question_misses():
+    cache = FAQCache()
+    cache.put("What is the AetherX launch date?", "Waitlist members hear first")
+    assert cache.get("When is the AetherX launch date?") == "Waitlist members hear first"
+    # Close in spelling, but a different question: serving the cached answer would be wrong
+    assert cache.get("What is the AetherX launch city?") is None
+    assert cache.get("What is not the AetherX launch date?") is None
+    assert cache.get("What is the AetherX launch?") is None
+    assert cache.get("What is it?") is None
+
+
+def test_ttl_expiry():
+    cache = FAQCache(ttl=0.01)
+    cache.put("When is the launch?", "Soon")
+    time.sleep(0.02)
+    assert cache.get("When is the launch?") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_and_invalidate():
+    cache = FAQCache(max_entries=2)
+    cache.put("what is aetherx", "a")
+    cache.put("when is the launch date", "b")
+    cache.get("what is aetherx")
+    cache.put("how do i join the waitlist", "c")
+    assert cache.get("when is the launch date") is None
+    assert cache.get("what is aetherx") == "a"
+    assert cache.invalidate() == 2
+    assert cache.get("what is aetherx") is None
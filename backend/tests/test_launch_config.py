@@ -0,0 +1,69 @@
+"""
+Unit tests for the cached, ETag-validated launch config
+"""
+import asyncio
+import json
+
+from launch_config import LaunchConfigCache, etag_matches
+
+
+class FakeLaunchConfig:
+    def __init__(self):
+        self.doc = None
+        self.finds = 0
+
+    async def find_one(self, query, projection=None):
+        self.finds += 1
+        return None if self.doc is None else {k: v for k, v in self.doc.items() if k != "_id"}
+
+    async def update_one(self, query, update, upsert=False):
+        if self.doc is None:
+            self.doc = dict(update["$setOnInsert"])
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.doc = dict(doc)
+
+
+class FakeDB:
+    def __init__(self):
+        self.launch_config = FakeLaunchConfig()
+
+
+def test_default_is_seeded_once_and_cached():
+    db = FakeDB()
+    cache = LaunchConfigCache(ttl=60)
+
+    async def run():
+        first = await cache.get(db)
+        second = await cache.get(db)
+        return first, second
+
+    (body1, etag1), (body2, etag2) = asyncio.run(run())
+    assert body1 == body2 and etag1 == etag2
+    assert "launch_date" in json.loads(body1)
+    assert db.launch_config.finds == 2  # miss + read-back of the seeded default
+
+
+def test_write_changes_etag_without_reread():
+    db = FakeDB()
+    cache = LaunchConfigCache(ttl=60)
+
+    async def run():
+        _, before = await cache.get(db)
+        finds = db.launch_config.finds
+        await cache.set(db, {"launch_date": "2027-01-01T00:00:00+00:00"})
+        body, after = await cache.get(db)
+        return before, after, body, db.launch_config.finds - finds
+
+    before, after, body, extra_finds = asyncio.run(run())
+    assert before != after
+    assert json.loads(body)["launch_date"] == "2027-01-01T00:00:00+00:00"
+    assert extra_finds == 0
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
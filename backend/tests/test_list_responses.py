@@ -0,0 +1,42 @@
+"""
+Tests for the orjson-encoded list endpoints
+"""
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+import server
+from memory_mongo import MemoryDatabase
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_status_checks_are_encoded_from_raw_documents(monkeypatch):
+    db = MemoryDatabase()
+    db.status_checks.docs = [
+        {"id": f"s{i}", "client_name": "web", "timestamp": T0 + timedelta(minutes=i)} for i in range(3)
+    ]
+    monkeypatch.setattr(server, "db", db)
+
+    with TestClient(server.app) as client:
+        first = client.get("/api/status", params={"limit": 2})
+        rest = client.get("/api/status", params={"limit": 2, "cursor": first.headers["x-next-cursor"]})
+
+    assert first.headers["content-type"] == "application/json"
+    assert first.json() == [
+        {"id": "s0", "client_name": "web", "timestamp": "2026-01-01T00:00:00+00:00"},
+        {"id": "s1", "client_name": "web", "timestamp": "2026-01-01T00:01:00+00:00"},
+    ]
+    assert [s["id"] for s in rest.json()] == ["s2"]
+    assert "x-next-cursor" not in rest.headers
+
+
+def test_chat_history_includes_queued_turns(monkeypatch):
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+
+    with TestClient(server.app) as client:
+        client.post("/api/chat", json={"session_id": "s", "message": "Hello"})
+        history = client.get("/api/chat/history/s").json()["history"]
+
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert datetime.fromisoformat(history[0]["timestamp"]).tzinfo is not None
@@ -0,0 +1,70 @@
+"""
+Tests for the in-memory Mongo stand-in and the offline benchmark harness
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from bench import compare, run_benchmark
+from memory_mongo import MemoryDatabase
+
+
+def test_query_sort_projection_and_unique_index():
+    async def run():
+        db = MemoryDatabase()
+        await db.subs.create_index("email", unique=True)
+        await db.subs.insert_many([{"email": f"u{i}@x.io", "n": i} for i in range(5)])
+        with pytest.raises(DuplicateKeyError):
+            await db.subs.insert_one({"email": "u1@x.io"})
+        with pytest.raises(BulkWriteError) as exc:
+            await db.subs.insert_many([{"email": "u9@x.io"}, {"email": "u2@x.io"}], ordered=False)
+        assert exc.value.details["nInserted"] == 1
+
+        docs = await db.subs.find(
+            {"$or": [{"n": {"$gte": 3}}, {"email": "u0@x.io"}]}, {"_id": 0, "n": 1}
+        ).sort("n", -1).to_list(10)
+        assert docs == [{"n": 4}, {"n": 3}, {"n": 0}]
+        assert await db.subs.count_documents({}) == 6
+
+    asyncio.run(run())
+
+
+def test_upserts_and_updates():
+    async def run():
+        db = MemoryDatabase()
+        before = await db.subs.find_one_and_update(
+            {"email": "a@x.io"}, {"$setOnInsert": {"id": "1"}}, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+        assert before is None
+        before = await db.subs.find_one_and_update(
+            {"email": "a@x.io"}, {"$setOnInsert": {"id": "2"}}, projection={"_id": 0, "id": 1}, upsert=True
+        )
+        assert before == {"id": "1"}
+        await db.counters.update_one({"_id": "c"}, {"$inc": {"value": 2}}, upsert=True)
+        await db.counters.update_one({"_id": "c"}, {"$inc": {"value": 3}}, upsert=True)
+        assert (await db.counters.find_one({"_id": "c"}))["value"] == 5
+        await db.cfg.replace_one({}, {"launch_date": "x"}, upsert=True)
+        await db.cfg.replace_one({}, {"launch_date": "y"}, upsert=True)
+        assert await db.cfg.find_one({}, {"_id": 0}) == {"launch_date": "y"}
+        assert await db.cfg.count_documents({"updated_at": {"$type": "date"}}) == 0
+        await db.cfg.update_one({}, {"$set": {"updated_at": datetime.now(timezone.utc)}})
+        assert await db.cfg.count_documents({"updated_at": {"$type": "date"}}) == 1
+
+    asyncio.run(run())
+
+
+def test_benchmark_smoke():
+    results = asyncio.run(run_benchmark(
+        ["chat", "subscribe", "count", "launch_config"], total=20, concurrency=4,
+        llm_latency=0.001, llm_tokens_per_second=10000, mongo_latency=0,
+    ))
+    for name, r in results.items():
+        assert r["errors"] == 0, name
+        assert r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"]
+
+    slower = {name: {**r, "p95_ms": r["p95_ms"] * 2 + 1} for name, r in results.items()}
+    assert compare(slower, {"results": results}, 0.2)
+    assert compare(results, {"results": results}, 0.2) == []
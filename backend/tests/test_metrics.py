@@ -0,0 +1,52 @@
+"""
+Tests for the Prometheus metrics registry and /metrics endpoint
+"""
+import threading
+
+from fastapi.testclient import TestClient
+
+import server
+from memory_mongo import MemoryDatabase
+from metrics import Registry
+
+
+def test_counter_shards_are_summed_across_threads():
+    registry = Registry()
+    counter = registry.counter("things_total", "Things", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.collect() == {("a",): 4000.0}
+    assert 'things_total{kind="a"} 4000' in registry.render()
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'latency_seconds_sum{route="/a"} 5.55' in text
+
+
+def test_metrics_endpoint_reports_route_templates(monkeypatch):
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+    with TestClient(server.app) as client:
+        assert client.get("/api/chat/history/TEST_metrics").status_code == 200
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/chat/history/{session_id}"' in response.text
+    assert "TEST_metrics" not in response.text
@@ -0,0 +1,57 @@
+"""
+Unit tests for the streaming newsletter CSV import
+"""
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from newsletter_import import import_subscriber_csv, normalize_email
+
+
+class InsertResult:
+    def __init__(self, ids):
+        self.inserted_ids = ids
+
+
+class UniqueEmailCollection:
+    def __init__(self, existing=()):
+        self.emails = set(existing)
+        self.calls = 0
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls += 1
+        errors, inserted = [], 0
+        for i, doc in enumerate(docs):
+            if doc["email"] in self.emails:
+                errors.append({"index": i, "code": 11000})
+            else:
+                self.emails.add(doc["email"])
+                inserted += 1
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": inserted})
+        return InsertResult(list(range(inserted)))
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_normalize_email():
+    assert normalize_email(" Ada@Example.COM ") == "Ada@example.com"
+    assert normalize_email("not-an-email") is None
+
+
+def test_import_counts_inserted_duplicates_and_invalid():
+    csv_body = "name,email\nAda,ada@example.com\nBob,bob@example.com\n,bad\nAda again,ada@example.com\nCy,cy@example.com"
+    collection = UniqueEmailCollection(existing={"cy@example.com"})
+    stats = asyncio.run(import_subscriber_csv(collection, chunked(csv_body.encode(), 7), batch_size=2))
+    assert stats == {"inserted": 2, "duplicates": 2, "invalid": 1, "failed": 0}
+    assert collection.calls == 2
+
+
+def test_import_without_header():
+    body = b"one@example.com\ntwo@example.com\n"
+    collection = UniqueEmailCollection()
+    stats = asyncio.run(import_subscriber_csv(collection, chunked(body, 1000)))
+    assert stats["inserted"] == 2
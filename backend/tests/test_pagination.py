@@ -0,0 +1,57 @@
+"""
+Unit tests for keyset pagination and streaming export
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, export_rows, keyset_query
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def aiter(docs):
+    for doc in docs:
+        yield doc
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"id": "abc", "timestamp": T0}, "timestamp")
+    assert decode_cursor(cursor) == (T0, "abc")
+
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("garbage!")
+    assert exc.value.status_code == 400
+
+
+def test_keyset_query_breaks_ties_on_id():
+    cursor = encode_cursor({"id": "b", "subscribed_at": T0}, "subscribed_at")
+    assert keyset_query("subscribed_at", cursor) == {"$or": [
+        {"subscribed_at": {"$gt": T0}},
+        {"subscribed_at": T0, "id": {"$gt": "b"}},
+    ]}
+    assert keyset_query("subscribed_at", None) == {}
+
+
+def collect(gen):
+    async def run():
+        return "".join([chunk async for chunk in gen])
+    return asyncio.run(run())
+
+
+def test_export_ndjson_and_csv():
+    docs = [{"id": str(i), "email": f"u{i}@example.com", "subscribed_at": T0 + timedelta(minutes=i)}
+            for i in range(1200)]
+    lines = collect(export_rows(aiter(docs), "ndjson", ["id", "email", "subscribed_at"])).splitlines()
+    assert len(lines) == 1200
+    assert json.loads(lines[1])["subscribed_at"] == (T0 + timedelta(minutes=1)).isoformat()
+
+    rows = collect(export_rows(aiter(docs), "csv", ["id", "email", "name"])).splitlines()
+    assert rows[0] == "id,email,name"
+    assert rows[2] == "1,u1@example.com,"
+    assert len(rows) == 1201
@@ -0,0 +1,60 @@
+"""
+Tests for the on-demand request profiler
+"""
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfileStore, ProfilingMiddleware
+
+
+async def slow_upstream_call():
+    await asyncio.sleep(0.05)
+
+
+def make_app(store: ProfileStore, **kwargs) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        await slow_upstream_call()
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, store=store, interval=0.002, **kwargs)
+    return app
+
+
+def test_profiles_only_requests_with_token():
+    store = ProfileStore(capacity=5)
+    with TestClient(make_app(store, token="secret")) as client:
+        assert "x-profile-id" not in client.get("/work").headers
+        assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+        response = client.get("/work", headers={"X-Profile": "secret"})
+
+    [summary] = store.list()
+    assert response.headers["x-profile-id"] == summary["id"]
+    assert summary["path"] == "/work" and summary["status"] == 200
+    assert summary["samples"] > 0
+
+
+def test_folded_stacks_include_time_spent_awaiting():
+    store = ProfileStore()
+    with TestClient(make_app(store, sample_rate=1.0)) as client:
+        profile_id = client.get("/work").headers["x-profile-id"]
+
+    lines = store.get(profile_id).folded().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    # The dominant stack is the suspended await inside the handler
+    assert "slow_upstream_call (test_profiling.py" in stack
+    assert stack.split(";")[-1].startswith("<await")
+
+
+def test_ring_buffer_is_bounded():
+    store = ProfileStore(capacity=2)
+    with TestClient(make_app(store, sample_rate=1.0)) as client:
+        ids = [client.get("/work").headers["x-profile-id"] for _ in range(3)]
+
+    assert [p["id"] for p in store.list()] == ids[:0:-1]
+    assert store.get(ids[0]) is None
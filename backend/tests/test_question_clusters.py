@@ -0,0 +1,70 @@
+"""
+Tests for visitor question clustering
+"""
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import server
+from memory_mongo import MemoryDatabase
+from question_clusters import QuestionClusterer
+
+TOPICS = {
+    "pricing": ["How much does AetherX cost?", "What will the pro plan cost?", "Does the team plan cost more?"],
+    "launch": ["When is the launch date?", "When does AetherX launch?", "What date is the launch?"],
+    "languages": ["Which languages are supported?", "Does it support Spanish languages?"],
+}
+
+
+def history(repeat=30):
+    docs = []
+    for topic, questions in TOPICS.items():
+        for i in range(repeat):
+            for j, question in enumerate(questions):
+                docs.append({"id": f"{topic}-{i}-{j}", "session_id": f"s{i}", "role": "user", "content": question})
+                docs.append({"id": f"{topic}-{i}-{j}-a", "session_id": f"s{i}", "role": "assistant",
+                             "content": "Join the waitlist to find out!"})
+    return docs
+
+
+def test_vectors_are_unit_length_and_sparse():
+    clusterer = QuestionClusterer(n_features=1024)
+    idf = np.ones(1024, dtype=np.float32)
+    indptr, cols, vals = clusterer._vectorize(["When is the AetherX launch?", "price price"], idf)
+    # "aetherx", "launch" and "aetherx launch"; stop words dropped, repeats counted once
+    assert list(np.diff(indptr)) == [3, 2]
+    rows = np.repeat([0, 1], np.diff(indptr))
+    assert np.allclose(np.bincount(rows, weights=vals * vals), 1.0)
+
+
+def test_clusters_group_questions_by_topic():
+    db = MemoryDatabase()
+    db.chat_history.docs = history()
+    # Small chunks: many mini-batch steps over the stream
+    clusterer = QuestionClusterer(k=3, n_features=4096, chunk_size=50, per_cluster=3)
+    result = asyncio.run(clusterer.run(db))
+
+    assert result["documents"] == 30 * 8
+    assert sorted(c["count"] for c in result["clusters"]) == [60, 90, 90]
+    for cluster in result["clusters"]:
+        topics = {t for t, questions in TOPICS.items() for q in cluster["questions"] if q in questions}
+        assert len(topics) == 1
+        assert sorted(cluster["questions"]) == sorted(TOPICS[topics.pop()])
+    assert asyncio.run(clusterer.latest(db))["documents"] == 240
+
+
+def test_admin_endpoint_runs_in_background(monkeypatch):
+    db = MemoryDatabase()
+    db.chat_history.docs = history(repeat=2)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "question_clusters", QuestionClusterer(k=3, n_features=4096))
+
+    with TestClient(server.app) as client:
+        assert client.post("/api/chat/clusters").status_code == 202
+        while server.question_clusters.running:
+            client.portal.call(asyncio.sleep, 0.01)
+        result = client.get("/api/chat/clusters").json()
+
+    assert result["running"] is False
+    assert result["result"]["documents"] == 16
@@ -0,0 +1,113 @@
+"""
+Tests for the token-bucket rate limiter
+"""
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import server
+from llm_provider import FakeLLMProvider
+from memory_mongo import MemoryDatabase
+from rate_limit import RateLimiter, TokenBuckets, client_ip, parse_rate
+from state_backend import LocalState
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_request(host="10.0.0.1", forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (host, 1234)})
+
+
+def test_parse_rate():
+    assert parse_rate("30/60") == (0.5, 30.0)
+    assert parse_rate("5") == (5.0, 5.0)
+    assert parse_rate("0") is None and parse_rate("") is None
+
+
+def test_bucket_refills_over_time():
+    clock = Clock()
+    buckets = TokenBuckets(rate=1.0, burst=2, clock=clock)
+    for _ in range(2):
+        assert buckets.wait("a") == 0
+        buckets.take("a")
+    assert buckets.wait("a") == pytest.approx(1.0)
+    clock.now = 0.5
+    assert buckets.wait("a") == pytest.approx(0.5)
+    clock.now = 1.0
+    assert buckets.wait("a") == 0
+
+
+def test_bucket_table_is_bounded_lru():
+    state = LocalState(max_keys=2)
+    buckets = TokenBuckets(rate=1.0, burst=1, state=state, clock=Clock())
+    buckets.take("a")
+    buckets.take("b")
+    buckets.take("a")
+    buckets.take("c")
+    assert state.stats()["entries"] == 2 and state.evicted == 1
+    # "b" was the coldest key and comes back with a full bucket
+    assert buckets.wait("b") == 0 and buckets.wait("a") > 0
+
+
+def test_rejection_spends_no_tokens():
+    limiter = RateLimiter({"chat": {"ip": (1.0, 5), "session": (1.0, 1)}})
+    limiter.check("chat", make_request(), "s1")
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("chat", make_request(), "s1")
+    assert exc.value.status_code == 429 and exc.value.headers["Retry-After"] == "1"
+    # The rejected call did not drain the IP bucket
+    for _ in range(4):
+        limiter.check("chat", make_request(), None)
+    assert limiter.stats()["routes"]["chat"]["session"]["rejected"] == 1
+
+
+def test_forwarded_for_uses_proxy_appended_entry():
+    request = make_request(forwarded="6.6.6.6, 1.2.3.4")
+    assert client_ip(request, forwarded_hops=1) == "1.2.3.4"
+    assert client_ip(request) == "10.0.0.1"
+
+
+def test_subscribe_is_limited_before_touching_mongo(monkeypatch):
+    db = MemoryDatabase()
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "rate_limits", RateLimiter({"subscribe": {"ip": parse_rate("2/60")}}))
+
+    with TestClient(server.app) as client:
+        statuses = [
+            client.post("/api/newsletter/subscribe", json={"email": f"u{i}@example.com"}) for i in range(3)
+        ]
+
+    assert [r.status_code for r in statuses] == [200, 200, 429]
+    assert int(statuses[-1].headers["retry-after"]) == 30
+    assert len(db.newsletter_subscriptions.docs) == 2
+
+
+def test_global_llm_budget_spares_cached_answers(monkeypatch):
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+    monkeypatch.setattr(server, "llm", FakeLLMProvider(latency=0, tokens_per_second=10000))
+    monkeypatch.setattr(server, "rate_limits", RateLimiter({"llm": {"global": parse_rate("2/60")}}))
+    server.faq_cache.invalidate()
+
+    with TestClient(server.app) as client:
+        cached = [
+            client.post("/api/chat", json={"session_id": f"s{i}", "message": "When is the launch date?"})
+            for i in range(4)
+        ]
+        fresh = [
+            client.post("/api/chat", json={"session_id": "s9", "message": question})
+            for question in ("Which languages are supported?", "Is there a team plan?")
+        ]
+
+    # One upstream call answers all four; the cache hits take no global tokens
+    assert [r.status_code for r in cached] == [200] * 4
+    assert server.llm.calls == 2
+    assert [r.status_code for r in fresh] == [200, 429]
+    assert server.rate_limits.stats()["routes"]["llm"]["global"]["rejected"] == 1
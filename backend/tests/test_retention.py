@@ -0,0 +1,99 @@
+"""
+Tests for chat history archiving and restore
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+import server
+from memory_mongo import MemoryDatabase
+from retention import ChatArchiver, pack_turns, unpack_turns
+from schema import ensure_indexes
+
+NOW = datetime.now(timezone.utc)
+
+
+def turns(session_id, start, n):
+    return [
+        {"id": f"{session_id}-{i}", "session_id": session_id, "role": "user" if i % 2 == 0 else "assistant",
+         "content": f"turn {i}", "timestamp": start + timedelta(seconds=i)}
+        for i in range(n)
+    ]
+
+
+def make_db():
+    db = MemoryDatabase()
+    db.chat_history.docs = turns("idle", NOW - timedelta(days=30), 4) + turns("active", NOW - timedelta(days=30), 2)
+    db.chat_history.docs += turns("active-recent", NOW, 1)
+    db.chat_history.docs[-1]["session_id"] = "active"
+    db.chat_summaries.docs = [{"session_id": "idle", "summary": "Asked about pricing", "through": NOW}]
+    return db
+
+
+def test_pack_round_trip():
+    original = turns("s", NOW, 3)
+    assert unpack_turns("s", pack_turns(original)) == original
+
+
+def test_archives_only_idle_sessions():
+    db = make_db()
+    archiver = ChatArchiver(idle_after=7 * 86400, batch_size=1)
+
+    assert asyncio.run(archiver.archive_idle(db)) == 1
+
+    assert {d["session_id"] for d in db.chat_history.docs} == {"active"}
+    assert db.chat_summaries.docs == []
+    [archived] = db.chat_archive.docs
+    assert archived["session_id"] == "idle" and archived["turns"] == 4
+    assert archived["summary"]["summary"] == "Asked about pricing"
+    assert [t["content"] for t in unpack_turns("idle", archived["data"])] == [f"turn {i}" for i in range(4)]
+
+
+def test_restore_moves_session_back_once():
+    db = make_db()
+    archiver = ChatArchiver(idle_after=7 * 86400)
+    asyncio.run(archiver.archive_idle(db))
+
+    assert asyncio.run(archiver.restore(db, "idle")) is True
+    assert asyncio.run(archiver.restore(db, "idle")) is False
+    assert len([d for d in db.chat_history.docs if d["session_id"] == "idle"]) == 4
+    assert db.chat_summaries.docs[0]["summary"] == "Asked about pricing"
+    assert db.chat_archive.docs == []
+
+
+def test_ttl_index_on_per_document_expiry():
+    db = MemoryDatabase()
+    # Left behind by earlier versions, which expired on `timestamp` itself
+    asyncio.run(db.chat_history.create_index("timestamp", name="timestamp_ttl", expireAfterSeconds=86400))
+    asyncio.run(ensure_indexes(db, chat_history_ttl=86400))
+    indexes = asyncio.run(db.chat_history.index_information())
+    assert "timestamp_ttl" not in indexes
+    assert indexes["expires_at_ttl"]["key"] == [("expires_at", 1)]
+    assert indexes["expires_at_ttl"]["expireAfterSeconds"] == 0
+
+
+def test_restored_turns_get_a_fresh_expiry():
+    db = make_db()
+    archiver = ChatArchiver(idle_after=7 * 86400, hot_ttl=90 * 86400)
+    asyncio.run(archiver.archive_idle(db))
+    asyncio.run(archiver.restore(db, "idle"))
+
+    restored = [d for d in db.chat_history.docs if d["session_id"] == "idle"]
+    # The turns are 30 days old, but the TTL clock restarts when they come back
+    assert all(d["expires_at"] > NOW + timedelta(days=89) for d in restored)
+
+
+def test_returning_session_is_restored_transparently(monkeypatch):
+    db = make_db()
+    asyncio.run(ChatArchiver(idle_after=7 * 86400).archive_idle(db))
+    monkeypatch.setattr(server, "db", db)
+
+    with TestClient(server.app) as client:
+        history = client.get("/api/chat/history/idle").json()["history"]
+        assert [m["content"] for m in history] == [f"turn {i}" for i in range(4)]
+        client.post("/api/chat", json={"session_id": "idle", "message": "Back again"})
+        history = client.get("/api/chat/history/idle").json()["history"]
+
+    assert len(history) == 6
+    assert db.chat_archive.docs == []
@@ -0,0 +1,30 @@
+"""
+Tests for the schema bootstrap
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import server
+from memory_mongo import MemoryDatabase
+from schema import ensure_indexes
+
+
+def test_startup_keeps_duplicates_unless_asked(monkeypatch):
+    db = MemoryDatabase()
+    db.newsletter_subscriptions.docs = [
+        {"_id": 1, "email": "a@example.com"},
+        {"_id": 2, "email": "b@example.com"},
+        {"_id": 3, "email": "a@example.com"},
+    ]
+    asyncio.run(ensure_indexes(db))
+    assert len(db.newsletter_subscriptions.docs) == 3
+    assert "email_unique" not in asyncio.run(db.newsletter_subscriptions.index_information())
+
+    monkeypatch.setattr(server, "db", db)
+    with TestClient(server.app) as client:
+        result = client.post("/api/newsletter/dedupe").json()
+
+    assert result == {"duplicates": 1, "moved": 1, "indexed": True}
+    assert [d["_id"] for d in db.newsletter_subscriptions.docs] == [1, 2]
+    assert [(d["_id"], d["duplicate_of"]) for d in db.newsletter_duplicates.docs] == [(3, 1)]
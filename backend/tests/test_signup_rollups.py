@@ -0,0 +1,59 @@
+"""
+Tests for the waitlist growth rollups
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+import server
+from memory_mongo import MemoryDatabase
+from rate_limit import RateLimiter
+from signup_rollups import rebuild_rollups, signup_growth
+
+T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def subscriber(i, at, source="waitlist"):
+    return {"id": f"u{i}", "email": f"u{i}@example.com", "subscribed_at": at, "source": source}
+
+
+def test_subscribe_and_import_increment_rollups(monkeypatch):
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+    monkeypatch.setattr(server, "rate_limits", RateLimiter({}))
+
+    with TestClient(server.app) as client:
+        asyncio.run(server.db.newsletter_subscriptions.create_index("email", unique=True))
+        client.post("/api/newsletter/subscribe", json={"email": "ada@example.com"})
+        client.post("/api/newsletter/subscribe", json={"email": "ada@example.com"})
+        client.post("/api/newsletter/import?source=partner", content=b"email\nbob@example.com\nada@example.com\n")
+        growth = client.get("/api/newsletter/growth").json()
+
+    # The repeat signup and the already-subscribed import row are not counted
+    assert growth["total"] == 2
+    assert growth["sources"] == {"waitlist": 1, "partner": 1}
+    assert len(growth["series"]) == 1
+
+
+def test_rebuild_replaces_drifted_rollups_in_chunks():
+    db = MemoryDatabase()
+    db.newsletter_subscriptions.docs = [
+        subscriber(0, T0 + timedelta(minutes=5)),
+        subscriber(1, T0 + timedelta(minutes=50), "partner"),
+        subscriber(2, T0 + timedelta(days=9, hours=3)),
+    ]
+    db.signup_rollups.docs = [
+        {"bucket": T0, "source": "waitlist", "count": 7},
+        {"bucket": T0 + timedelta(days=2), "source": "waitlist", "count": 4},
+    ]
+
+    stats = asyncio.run(rebuild_rollups(db, chunk_days=7))
+    assert (stats["buckets"], stats["removed"]) == (3, 1)
+    assert stats["chunks"] > 1
+
+    growth = asyncio.run(signup_growth(db, "day"))
+    assert growth["total"] == 3
+    assert [(s["start"], s["count"]) for s in growth["series"]] == [(T0, 2), (T0 + timedelta(days=9), 1)]
+
+    hourly = asyncio.run(signup_growth(db, "hour", start=T0 + timedelta(days=1), source="waitlist"))
+    assert [s["start"] for s in hourly["series"]] == [T0 + timedelta(days=9, hours=3)]
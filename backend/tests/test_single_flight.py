@@ -0,0 +1,72 @@
+"""
+Unit tests for single-flight request deduplication
+"""
+import asyncio
+
+import pytest
+
+import server
+from bench import ASGIDriver
+from llm_provider import FakeLLMProvider
+from memory_mongo import MemoryDatabase
+from rate_limit import RateLimiter
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("hello", fetch) for _ in range(20)))
+        return flights, results
+
+    flights, results = asyncio.run(run())
+    assert results == ["answer"] * 20
+    assert calls == 1
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "followers": 19}
+
+
+def test_errors_propagate_and_key_is_released():
+    async def boom():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(flights.do("k", boom), flights.do("k", boom), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert len(flights) == 0
+        with pytest.raises(RuntimeError):
+            await flights.do("k", boom)
+        return flights.leaders
+
+    assert asyncio.run(run()) == 2
+
+
+def test_busy_leader_session_does_not_reject_followers(monkeypatch):
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+    monkeypatch.setattr(server, "llm", FakeLLMProvider(latency=0.05, tokens_per_second=1000))
+    monkeypatch.setattr(server, "rate_limits", RateLimiter({}))
+    server.faq_cache.invalidate()
+
+    async def run():
+        driver = ASGIDriver(server.app)
+
+        def ask(sid):
+            return driver.request("POST", "/api/chat", {"session_id": sid, "message": "When do you launch?"})
+
+        async with server.app.router.lifespan_context(server.app):
+            # Session "a" already has a reply in progress when it asks again
+            with server.llm_admission.session_turn("a"):
+                return await asyncio.gather(ask("a"), ask("b"), ask("c"))
+
+    statuses = [status for status, _ in asyncio.run(run())]
+    assert statuses == [429, 200, 200]
+    assert server.llm.calls == 1
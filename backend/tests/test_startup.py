@@ -0,0 +1,105 @@
+"""
+Unit tests for startup warm-up, the readiness probe and the startup report
+"""
+import asyncio
+import json
+
+import server
+from bench import ASGIDriver
+from llm_provider import FakeLLMProvider
+from memory_mongo import MemoryDatabase
+from startup import StartupReport, warm_mongo
+
+
+class CountingDatabase(MemoryDatabase):
+    def __init__(self):
+        super().__init__(latency=0.01)
+        self.in_flight = self.peak = 0
+
+    async def command(self, command, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await super().command(command, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+def test_warm_mongo_runs_pings_concurrently():
+    db = CountingDatabase()
+    asyncio.run(warm_mongo(db, 5))
+    assert db.peak == 5
+
+
+def test_failed_phase_is_reported_not_raised():
+    async def boom():
+        raise ConnectionError("no route to host")
+
+    report = StartupReport()
+    assert asyncio.run(report.timed("mongo_pool", boom())) is False
+    assert report.as_dict()["errors"] == {"mongo_pool": "no route to host"}
+    assert not report.ready and "mongo_pool" in report.phases
+
+
+def test_not_ready_until_warm_up_finishes(monkeypatch):
+    llm = FakeLLMProvider(latency=0)
+    warmed = asyncio.Event()
+
+    async def slow_warm():
+        await warmed.wait()
+
+    monkeypatch.setattr(llm, "warm", slow_warm)
+    monkeypatch.setattr(server, "llm", llm)
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+    monkeypatch.setattr(server, "MONGO_WARM_CONNECTIONS", 2)
+    monkeypatch.setattr(server, "startup_report", StartupReport())
+
+    async def run():
+        driver = ASGIDriver(server.app)
+        async with server.app.router.lifespan_context(server.app):
+            before, _ = await driver.request("GET", "/api/ready")
+            warmed.set()
+            while not server.startup_report.ready:
+                await asyncio.sleep(0.001)
+            after, _ = await driver.request("GET", "/api/ready")
+            _, report = await driver.request("GET", "/api/startup")
+        return before, after, json.loads(report)
+
+    before, after, report = asyncio.run(run())
+    assert (before, after) == (503, 200)
+    assert set(report["phases"]) >= {"mongo_pool", "llm_client"}
+    assert report["errors"] == {}
+
+
+def test_unreachable_mongo_keeps_replica_unready(monkeypatch):
+    db = MemoryDatabase()
+    reachable = False
+
+    async def ping(command, **kwargs):
+        if not reachable:
+            raise ConnectionError("no route to host")
+        return {"ok": 1}
+
+    monkeypatch.setattr(db, "command", ping)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "llm", FakeLLMProvider(latency=0))
+    monkeypatch.setattr(server, "STARTUP_WARMUP_RETRY", 0.01)
+    monkeypatch.setattr(server, "startup_report", StartupReport())
+
+    async def run():
+        nonlocal reachable
+        driver = ASGIDriver(server.app)
+        async with server.app.router.lifespan_context(server.app):
+            while server.startup_report.attempts < 2:
+                await asyncio.sleep(0.001)
+            down = await driver.request("GET", "/api/ready")
+            reachable = True
+            while not server.startup_report.ready:
+                await asyncio.sleep(0.001)
+            up, _ = await driver.request("GET", "/api/ready")
+        return down, up
+
+    (status, body), up = asyncio.run(run())
+    assert status == 503
+    assert json.loads(body)["errors"] == {"mongo_pool": "no route to host"}
+    assert up == 200 and server.startup_report.errors == {}
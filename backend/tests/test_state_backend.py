@@ -0,0 +1,107 @@
+"""
+Tests for the in-process and memory-mapped state backends
+"""
+import multiprocessing
+import struct
+
+import pytest
+
+from state_backend import LocalState, MmapState
+
+
+@pytest.fixture(params=["local", "mmap"])
+def state(request, tmp_path):
+    if request.param == "local":
+        yield LocalState(max_keys=64)
+    else:
+        backend = MmapState(str(tmp_path / "state"), table_slots=64, ways=8, value_size=16)
+        yield backend
+        backend.close()
+
+
+def test_counters(state):
+    assert state.counter("hits") == 0
+    assert state.incr("hits") == 1
+    assert state.incr("hits", 5) == 6
+    assert state.counter("hits") == 6
+
+
+def test_table_get_set_update_delete(state):
+    assert state.get("k") is None
+    state.set("k", b"one")
+    assert state.get("k") == b"one"
+    assert state.update("k", lambda raw: raw + b"!") == b"one!"
+    state.delete("k")
+    assert state.get("k") is None
+
+
+def test_expiry(state, monkeypatch):
+    import state_backend
+    now = [1000.0]
+    monkeypatch.setattr(state_backend.time, "time", lambda: now[0])
+    state.set("k", b"v", ttl=10)
+    now[0] += 9
+    assert state.get("k") == b"v"
+    now[0] += 2
+    assert state.get("k") is None
+
+
+def test_mmap_table_is_bounded_and_evicts_least_recently_used(tmp_path):
+    state = MmapState(str(tmp_path / "state"), table_slots=8, ways=8, value_size=8)
+    for i in range(8):
+        state.set(f"k{i}", b"x")
+    state.get("k0")
+    state.set("k8", b"x")
+    assert state.get("k0") == b"x" and state.get("k1") is None
+    assert state.stats()["entries"] == 8 and state.stats()["evicted"] == 1
+    with pytest.raises(ValueError):
+        state.set("big", b"x" * 9)
+
+
+def _hammer(path, n):
+    state = MmapState(path, table_slots=64, value_size=16)
+    for _ in range(n):
+        state.incr("shared")
+        state.update("total", lambda raw: struct.pack("<q", (struct.unpack("<q", raw)[0] if raw else 0) + 1))
+
+
+def test_mmap_state_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "state")
+    MmapState(path, table_slots=64, value_size=16).close()
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_hammer, args=(path, 500)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    state = MmapState(path, table_slots=64, value_size=16)
+    assert state.counter("shared") == 2000
+    assert struct.unpack("<q", state.get("total"))[0] == 2000
+
+
+def test_mmap_refuses_a_file_laid_out_for_other_settings(tmp_path):
+    path = str(tmp_path / "state")
+    MmapState(path, table_slots=64, value_size=16).close()
+    with pytest.raises(RuntimeError, match="different settings"):
+        MmapState(path, table_slots=128, value_size=16)
+    # The original layout still opens
+    MmapState(path, table_slots=64, value_size=16).close()
+
+
+def test_session_cache_drops_copies_changed_by_another_worker():
+    from datetime import datetime, timezone
+
+    from chat_context import SessionContext, SessionContextCache
+
+    shared = LocalState()
+    worker_a = SessionContextCache(state=shared)
+    worker_b = SessionContextCache(state=shared)
+    now = datetime.now(timezone.utc)
+    worker_a.put("s", SessionContext([]))
+    worker_b.put("s", SessionContext([]))
+
+    worker_a.append("s", "user", "Hi", now)
+    assert worker_a.get("s").turns[-1]["content"] == "Hi"
+    # B's copy predates A's turn and must be reloaded from Mongo
+    assert worker_b.get("s") is None
@@ -0,0 +1,73 @@
+"""
+Tests for batch status ingestion and the bucketed rollup endpoint
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from memory_mongo import MemoryDatabase
+from status_checks import parse_status_batch
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "db", MemoryDatabase())
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def test_parse_json_list_and_ndjson():
+    assert parse_status_batch(b'[{"client_name": "a"}, {"client_name": "b"}]') == [
+        {"client_name": "a"}, {"client_name": "b"}
+    ]
+    assert parse_status_batch(b'{"client_name": "a"}\n\n{"client_name": "b"}\n', "application/x-ndjson") == [
+        {"client_name": "a"}, {"client_name": "b"}
+    ]
+    with pytest.raises(ValueError, match="Line 2"):
+        parse_status_batch(b'{"client_name": "a"}\n{oops\n')
+
+
+def test_batch_insert(client):
+    body = "\n".join(json.dumps({"client_name": f"probe-{i % 3}"}) for i in range(2500))
+    response = client.post("/api/status/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    assert response.json() == {"inserted": 2500}
+    assert len(server.db.status_checks.docs) == 2500
+    assert {"id", "client_name", "timestamp"} <= set(server.db.status_checks.docs[0])
+
+    assert client.post("/api/status/batch", json=[{"name": "no client"}]).status_code == 422
+
+
+def test_rollup_groups_by_client_and_bucket(client):
+    checks = [
+        {"client_name": "web", "timestamp": (T0 + timedelta(minutes=m)).isoformat()} for m in (1, 5, 65)
+    ] + [{"client_name": "api", "timestamp": (T0 + timedelta(minutes=30)).isoformat()}]
+    client.post("/api/status/batch", json=checks)
+
+    response = client.get("/api/status/rollup", params={
+        "bucket": "hour", "start": T0.isoformat(), "end": (T0 + timedelta(hours=3)).isoformat()
+    })
+    clients = {c["client_name"]: c for c in response.json()["clients"]}
+
+    assert clients["web"]["count"] == 3
+    assert clients["web"]["last_seen"] == "2026-01-01T01:05:00+00:00"
+    assert [(b["start"], b["count"]) for b in clients["web"]["buckets"]] == [
+        ("2026-01-01T00:00:00+00:00", 2), ("2026-01-01T01:00:00+00:00", 1)
+    ]
+    assert clients["api"]["count"] == 1
+
+    only_api = client.get("/api/status/rollup", params={
+        "start": T0.isoformat(), "end": (T0 + timedelta(hours=3)).isoformat(), "client_name": "api"
+    }).json()["clients"]
+    assert [c["client_name"] for c in only_api] == ["api"]
+
+
+def test_rollup_rejects_too_many_buckets(client):
+    response = client.get("/api/status/rollup", params={
+        "bucket": "minute", "start": T0.isoformat(), "end": (T0 + timedelta(days=30)).isoformat()
+    })
+    assert response.status_code == 400
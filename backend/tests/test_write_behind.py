@@ -0,0 +1,70 @@
+"""
+Unit tests for the chat history write-behind queue
+"""
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from write_behind import WriteBehindQueue
+
+
+def doc(session_id, n):
+    return {"id": f"{session_id}-{n}", "session_id": session_id, "content": str(n)}
+
+
+def test_batches_across_sessions_and_drains():
+    batches = []
+
+    async def insert_many(docs):
+        batches.append(docs)
+
+    async def run():
+        queue = WriteBehindQueue(insert_many, max_batch=4, flush_interval=0.05)
+        for n in range(3):
+            await queue.put(doc("a", n))
+            await queue.put(doc("b", n))
+        assert len(queue.pending("a")) == 3
+        await queue.drain()
+        assert queue.pending("a") == []
+        return queue
+
+    queue = asyncio.run(run())
+    assert [len(b) for b in batches] == [4, 2]
+    assert queue.written == 6
+
+
+def test_backpressure_bounds_buffer():
+    release = None
+
+    async def insert_many(docs):
+        await release.wait()
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        queue = WriteBehindQueue(insert_many, max_batch=1, flush_interval=0, max_buffer=2)
+        for n in range(3):
+            await queue.put(doc("a", n))
+        blocked = asyncio.create_task(queue.put(doc("a", 3)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        release.set()
+        await blocked
+        await queue.drain()
+
+    asyncio.run(run())
+
+
+def test_duplicate_key_errors_are_counted_not_raised():
+    async def insert_many(docs):
+        raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}]})
+
+    async def run():
+        queue = WriteBehindQueue(insert_many, max_batch=2)
+        await queue.put(doc("a", 0))
+        await queue.put(doc("a", 1))
+        await queue.drain()
+        return queue
+
+    queue = asyncio.run(run())
+    assert (queue.written, queue.failed) == (1, 1)
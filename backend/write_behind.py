@@ -0,0 +1,100 @@
+"""
+Write-behind batching for chat history.
+
+Documents from every session are buffered in a bounded queue and written with
+`insert_many(ordered=False)` once a batch fills up or the flush interval
+elapses. A full buffer makes producers wait (backpressure). Documents that are
+queued or in flight stay visible through `pending()` so a session always reads
+its own writes.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Batches documents into `insert_many` calls off the request path"""
+
+    def __init__(self, insert_many: Callable[[List[dict]], Awaitable], max_batch: int = 500,
+                 flush_interval: float = 0.05, max_buffer: int = 10000):
+        self.insert_many = insert_many
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._queue = None
+        self._task = None
+        # session_id -> {doc id: doc} for documents not yet acknowledged by Mongo
+        self._pending: Dict[str, Dict[str, dict]] = {}
+        self.written = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_buffer)
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, doc: dict):
+        self.start()
+        self._pending.setdefault(doc["session_id"], {})[doc["id"]] = doc
+        await self._queue.put(doc)
+
+    def pending(self, session_id: str) -> List[dict]:
+        return list(self._pending.get(session_id, {}).values())
+
+    async def flush(self):
+        """Wait until everything queued so far has been written"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def drain(self):
+        """Flush and stop the writer (shutdown hook)"""
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+
+    async def _write(self, batch: List[dict]):
+        # insert_many adds _id to the documents it is given, so hand it copies
+        try:
+            await self.insert_many([dict(doc) for doc in batch])
+            self.written += len(batch)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            self.written += len(batch) - len(errors)
+            self.failed += len(errors)
+            logger.error(f"Chat history batch write: {len(errors)} of {len(batch)} documents failed")
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Chat history batch write failed: {str(e)}")
+        finally:
+            for doc in batch:
+                session = self._pending.get(doc["session_id"])
+                if session is not None:
+                    session.pop(doc["id"], None)
+                    if not session:
+                        del self._pending[doc["session_id"]]
+                self._queue.task_done()